@@ -0,0 +1,40 @@
+#!/usr/bin/env python
+"""
+Compares wall time of CSV export built by single process against export
+built by a pool of worker processes (export_to_csv workers argument).
+
+    python benchmarks/parallel_export.py [contestants] [workers]
+
+Synthetic contest is stored in temporary sqlite database file, so worker
+processes can read it through their own connections.
+"""
+from __future__ import print_function
+
+import os
+import sys
+import time
+
+import synthetic
+
+
+def measure(label, contest, workers):
+    from ella_contests.exporters import export_to_csv
+
+    start = time.time()
+    size = sum(len(chunk) for chunk in export_to_csv(contest, False, 'export', workers=workers).streaming_content)
+    print('%-24s %10d bytes %10.2f s' % (label, size, time.time() - start))
+
+
+def main(contestants_count=50000, workers=4):
+    temporary = synthetic.setup_database()
+    try:
+        contest = synthetic.create_contest(contestants_count)
+        print('%d contestants' % contestants_count)
+        measure('single process', contest, 1)
+        measure('%d workers' % workers, contest, workers)
+    finally:
+        os.unlink(temporary)
+
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:3]])
@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+"""
+Compares size and deserialization time of the cached contest definition:
+pickled lists of Question and Choice model instances (as cached before)
+against the marshalled ContestSnapshot payload.
+
+    python benchmarks/snapshot_payload.py [questions] [choices per question]
+"""
+from __future__ import print_function
+
+import os
+import sys
+import timeit
+import pickle
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'test_ella_contests.settings')
+
+import django
+django.setup()
+
+from ella_contests.models import Question, Choice
+from ella_contests.snapshot import ContestSnapshot, QuestionData, ChoiceData
+
+
+def build_models(questions_count, choices_count):
+    questions = []
+    choices = {}
+    for q in range(1, questions_count + 1):
+        question = Question(id=q, contest_id=1, order=q, text='Question number %d?' % q, is_required=True)
+        questions.append(question)
+        choices[q] = [
+            Choice(id=q * 100 + c, question_id=q, order=c, choice='Choice %d of question %d' % (c, q),
+                   is_correct=c == 1, inserted_by_user=False)
+            for c in range(1, choices_count + 1)
+        ]
+    return questions, choices
+
+
+def build_snapshot(questions, choices):
+    return ContestSnapshot.from_rows(
+        [tuple(getattr(q, f) for f in QuestionData.__slots__) for q in questions],
+        [tuple(getattr(c, f) for f in ChoiceData.__slots__) for q in questions for c in choices[q.pk]]
+    )
+
+
+def measure(label, payload, loads, number):
+    seconds = timeit.timeit(lambda: loads(payload), number=number)
+    print('%-24s %10d bytes %10.1f us/load' % (label, len(payload), seconds / number * 10 ** 6))
+
+
+def main(questions_count=30, choices_count=4, number=2000):
+    questions, choices = build_models(questions_count, choices_count)
+    protocol = pickle.HIGHEST_PROTOCOL
+
+    models_payload = pickle.dumps((questions, choices), protocol)
+    snapshot_payload = pickle.dumps(build_snapshot(questions, choices).dumps(), protocol)
+
+    print('%d questions, %d choices each' % (questions_count, choices_count))
+    measure('model instances', models_payload, pickle.loads, number)
+    measure('snapshot', snapshot_payload, lambda p: ContestSnapshot.loads(pickle.loads(p)), number)
+
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:3]])
@@ -0,0 +1,201 @@
+#!/usr/bin/env python
+"""
+Measures query count, wall time and peak memory of exports, scoring and
+contest submission on synthetic contest and writes the results as JSON,
+so results of two releases can be compared.
+
+    python benchmarks/suite.py --contestants 20000 --output results.json
+    python benchmarks/suite.py --database postgresql --db-name scratch_db
+
+PostgreSQL connection is taken from PG* environment variables, use scratch
+database as the benchmark data are left in it.
+"""
+from __future__ import print_function
+
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import time
+from datetime import datetime
+
+try:
+    import tracemalloc
+except ImportError:
+    # python 2, peak memory is not measured
+    tracemalloc = None
+
+import synthetic
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--database', choices=('sqlite', 'postgresql'), default='sqlite')
+    parser.add_argument('--db-name', default=None, help='Database name (sqlite file path), temporary by default.')
+    parser.add_argument('--contestants', type=int, default=10000)
+    parser.add_argument('--questions', type=int, default=10)
+    parser.add_argument('--choices', type=int, default=4)
+    parser.add_argument('--free-text', type=float, default=0.2, help='Share of questions answered by text.')
+    parser.add_argument('--submissions', type=int, default=100, help='Count of submitted contestant forms.')
+    parser.add_argument('--repeat', type=int, default=3, help='Wall time is the best of this count of runs.')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=None, help='Path of JSON results, printed if not given.')
+    return parser.parse_args(argv)
+
+
+def measure(name, func, repeat):
+    """
+    Returns query count and peak memory of single run of func and the best
+    wall time of repeat runs made without tracing
+    """
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    gc.collect()
+    if tracemalloc is not None:
+        tracemalloc.start()
+    with CaptureQueriesContext(connection) as queries:
+        func()
+    peak_memory = None
+    if tracemalloc is not None:
+        peak_memory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    wall_times = []
+    for i in range(repeat):
+        gc.collect()
+        start = time.time()
+        func()
+        wall_times.append(time.time() - start)
+
+    result = {
+        'name': name,
+        'queries': len(queries.captured_queries),
+        'wall_time': min(wall_times) if wall_times else None,
+        'peak_memory': peak_memory,
+    }
+    print('%-28s %8d queries %10.3f s %12s bytes' % (
+        name, result['queries'], result['wall_time'] or 0, peak_memory if peak_memory is not None else '-'
+    ), file=sys.stderr)
+    return result
+
+
+def get_benchmarks(contest, args):
+    from django.contrib.auth.models import AnonymousUser
+    from django.http import HttpResponse
+    from django.test.client import RequestFactory
+
+    from ella_contests.exporters import ExportDataContainer, export_to_csv, export_to_xlsx
+    from ella_contests.forms import ContestantForm
+    from ella_contests.models import Contest, ContestStats
+    from ella_contests.storages import storage
+
+    def fresh_contest():
+        return Contest.objects.get(pk=contest.pk)
+
+    def consume(response):
+        for chunk in response.streaming_content:
+            pass
+
+    def export_csv():
+        consume(export_to_csv(fresh_contest(), False, 'export'))
+
+    def export_xlsx():
+        consume(export_to_xlsx(fresh_contest(), False, 'export'))
+
+    def export_rows():
+        for row in ExportDataContainer(fresh_contest()).get_rows_data():
+            list(row)
+
+    def correct_answers():
+        list(fresh_contest().get_contestants_with_correct_answer())
+
+    def all_correct_answers():
+        list(fresh_contest().get_contestants_with_all_correct_answers())
+
+    def rescore():
+        c = fresh_contest()
+        for contestant in c.contestant_set.order_by('pk')[:args.submissions]:
+            contestant.update_score()
+        ContestStats.objects.rebuild(c)
+
+    class View(object):
+        def __init__(self, contest, request):
+            self.contest = contest
+            self.request = request
+
+    submissions = {'count': 0}
+
+    def submit():
+        c = fresh_contest()
+        for i in range(args.submissions):
+            submissions['count'] += 1
+            request = RequestFactory().post('/')
+            request.user = AnonymousUser()
+            response = HttpResponse()
+            for question in c.questions:
+                choice = question.choices[0]
+                data = [str(choice.pk), 'text'] if choice.inserted_by_user else str(choice.pk)
+                storage.set_data(c, question.pk, {'choice': data}, response)
+            for name, morsel in response.cookies.items():
+                request.COOKIES[name] = morsel.value
+            form = ContestantForm(View(c, request), {
+                'name': 'Bench',
+                'surname': 'Mark',
+                'email': 'submission%d@example.com' % submissions['count'],
+                'address': 'Street 1',
+            })
+            if not form.is_valid():
+                raise AssertionError(form.errors)
+            form.save()
+
+    return [
+        ('export_csv', export_csv),
+        ('export_xlsx', export_xlsx),
+        ('export_container_rows', export_rows),
+        ('contestants_correct_answer', correct_answers),
+        ('contestants_all_correct_answers', all_correct_answers),
+        ('rescore', rescore),
+        ('submission', submit),
+    ]
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    temporary = synthetic.setup_database(args.database, args.db_name)
+    try:
+        import django
+        from django.db import connection
+
+        start = time.time()
+        contest = synthetic.create_contest(
+            args.contestants, args.questions, args.choices, args.free_text, seed=args.seed
+        )
+        print('synthetic contest created in %.1f s' % (time.time() - start), file=sys.stderr)
+
+        results = {
+            'meta': {
+                'created': datetime.utcnow().isoformat(),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+                'parameters': vars(args),
+            },
+            'benchmarks': [measure(name, func, args.repeat) for name, func in get_benchmarks(contest, args)],
+        }
+    finally:
+        if temporary is not None:
+            os.unlink(temporary)
+
+    output = json.dumps(results, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+"""
+Database set up and synthetic contests shared by the benchmarks.
+
+Importing this module configures Django with the test settings, call
+setup_database before importing anything using models.
+"""
+import os
+import random
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'test_ella_contests.settings')
+
+from django.conf import settings
+
+
+def setup_database(engine='sqlite', name=None):
+    """
+    Points default database to sqlite file (temporary one if name is not
+    given) or to existing PostgreSQL database configured by the usual PG*
+    environment variables, creates tables and returns path of the temporary
+    file to remove or None
+    """
+    temporary = None
+    if engine == 'sqlite':
+        if name is None:
+            db_file = tempfile.NamedTemporaryFile(suffix='.sqlite3', delete=False)
+            db_file.close()
+            name = temporary = db_file.name
+        settings.DATABASES['default'] = {'ENGINE': 'django.db.backends.sqlite3', 'NAME': name}
+    elif engine == 'postgresql':
+        settings.DATABASES['default'] = {
+            'ENGINE': 'django.db.backends.postgresql_psycopg2',
+            'NAME': name or os.environ.get('PGDATABASE', 'ella_contests_benchmark'),
+            'USER': os.environ.get('PGUSER', ''),
+            'PASSWORD': os.environ.get('PGPASSWORD', ''),
+            'HOST': os.environ.get('PGHOST', ''),
+            'PORT': os.environ.get('PGPORT', ''),
+        }
+    else:
+        raise ValueError('Unknown database engine %s' % engine)
+    settings.CACHES['default'] = {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+
+    import django
+    django.setup()
+
+    from django.core.management import call_command
+    call_command('migrate', verbosity=0, interactive=False)
+    return temporary
+
+
+class Fixtures(object):
+    """
+    Holder of objects created by ella test helpers in place of test case.
+    """
+
+    def addCleanup(self, func, *args, **kwargs):
+        # benchmark database is thrown away as a whole
+        pass
+
+
+def create_contest(contestants_count, questions_count=10, choices_count=4, free_text_share=0.2,
+                   correct_share=0.5, seed=0):
+    """
+    Creates contest where free_text_share of questions is answered by text
+    inserted by contestant and contestants pick the correct choice with
+    probability correct_share. Scores and stats are stored as submissions
+    through ContestantForm would store them.
+    """
+    from django.utils.timezone import now
+    from ella.utils.test_helpers import create_basic_categories
+    from ella_contests.models import Contest, Question, Choice, Contestant, Answer, ContestStats
+
+    rnd = random.Random(seed)
+    fixtures = Fixtures()
+    create_basic_categories(fixtures)
+    contest = Contest.objects.create(
+        title='Benchmark contest', slug='benchmark-contest-%d' % rnd.randint(0, 10 ** 9),
+        description='Benchmark contest', category=fixtures.category_nested, publish_from=now(),
+        published=True, text='Benchmark contest', active_from=now()
+    )
+
+    questions = []
+    for q in range(1, questions_count + 1):
+        question = Question.objects.create(contest=contest, order=q, text='Question %d?' % q, is_required=True)
+        free_text = rnd.random() < free_text_share
+        choices = [
+            Choice.objects.create(question=question, order=c, choice='Choice %d' % c, is_correct=c == 1,
+                                  inserted_by_user=free_text and c == 1)
+            for c in range(1, choices_count + 1)
+        ]
+        questions.append(choices)
+
+    created = now()
+    batch_size = 1000
+    for offset in range(0, contestants_count, batch_size):
+        contestants = []
+        picks = []
+        for i in range(offset, min(offset + batch_size, contestants_count)):
+            picked = [
+                choices[0] if rnd.random() < correct_share else rnd.choice(choices[1:] or choices)
+                for choices in questions
+            ]
+            score = sum(1 for c in picked if c.is_correct)
+            contestants.append(Contestant(
+                contest=contest, name='Name %d' % i, surname='Surname %d' % i, email='user%d@example.com' % i,
+                address='Street %d' % i, phone_number='%09d' % i, created=created,
+                score=score, all_correct=0 < score == questions_count
+            ))
+            picks.append(picked)
+        Contestant.objects.bulk_create(contestants)
+        emails = [c.email for c in contestants]
+        pks = dict(Contestant.objects.filter(contest=contest, email__in=emails).values_list('email', 'pk'))
+        Answer.objects.bulk_create([
+            Answer(contestant_id=pks[contestant.email], choice=choice,
+                   answer='Answer of %s' % contestant.name if choice.inserted_by_user else '')
+            for contestant, picked in zip(contestants, picks)
+            for choice in picked
+        ])
+
+    ContestStats.objects.rebuild(contest)
+    return contest
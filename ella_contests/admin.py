@@ -1,22 +1,30 @@
 from __future__ import unicode_literals
 
-from datetime import datetime
-
 from django.contrib import admin
 from django.contrib import messages
-from django.http import HttpResponseRedirect
+from django.http import HttpResponseRedirect, FileResponse
+from django.shortcuts import get_object_or_404
 from django.conf.urls import url
+from django.db.models import Prefetch
 from django.utils.safestring import mark_safe
-from django.template.defaultfilters import slugify
 from django.utils.translation import ugettext_lazy as _
 from django.core.urlresolvers import reverse
 
-from ella.core.cache import cache_this, get_cached_object_or_404
+from ella.core.cache import get_cached_object_or_404
 from ella.core.admin import PublishableAdmin, ListingInlineAdmin, RelatedInlineAdmin
 
-from ella_contests.models import Contestant, Answer, Choice, Contest, Question
+from ella_contests.conf import contests_settings
+from ella_contests.models import Contestant, Answer, Choice, Contest, Question, ContestStats, ExportJob
 from ella_contests.forms import ChoiceForm, ChoiceInlineFormset
-from ella_contests.exporters import ExportDataContainer, export_to_csv, export_to_xls
+from ella_contests.exporters import (
+    ExportDataContainer,
+    export_to_csv,
+    export_to_xlsx,
+    get_export_file_name,
+    compress_response,
+    COMPRESSIONS,
+)
+from ella_contests.artifacts import get_export_fingerprint, get_cached_export_response, cache_export_response
 
 
 class QuestionInlineAdmin(admin.TabularInline):
@@ -52,31 +60,37 @@ class ContestAdmin(PublishableAdmin):
     export_data_container_class = ExportDataContainer
     export_types = {
         'csv': (_('csv'), export_to_csv),
-        'xls': (_('xls'), export_to_xls),
+        'xlsx': (_('xlsx'), export_to_xlsx),
     }
 
+    def get_queryset(self, request):
+        return super(ContestAdmin, self).get_queryset(request).select_related('stats').prefetch_related(
+            Prefetch('export_jobs', queryset=ExportJob.objects.latest(), to_attr='latest_export_jobs')
+        )
+
+    def get_stats(self, obj):
+        try:
+            return obj.stats
+        except ContestStats.DoesNotExist:
+            return ContestStats(contest=obj)
+
     def contestants_count(self, obj):
         if obj.is_not_yet_active:
             return 0
         else:
-            return obj.contestant_set.count()
+            return self.get_stats(obj).contestants_count
     contestants_count.short_description = _('count of contestants')
 
     def questions_count(self, obj):
         return obj.questions_count
     questions_count.short_description = _('count of questions')
 
-    @cache_this(lambda adm, c: "ella_contests_admin_all_correct_answers_count_%s" % c.pk,
-                timeout=60 * 60)
     def contestants_all_correct_answers_count(self, obj):
-        all_required_questions = obj.question_set.filter(is_required=True).count()
-        return obj.get_contestants_with_correct_answer().filter(answers_count=all_required_questions).count()
+        return self.get_stats(obj).all_correct_answers_count
     contestants_all_correct_answers_count.short_description = _('contestants (all correct answers)')
 
-    @cache_this(lambda adm, c: "ella_contests_admin_correct_answers_count_%s" % c.pk,
-                timeout=60 * 60)
     def contestants_correct_answers_count(self, obj):
-        return obj.get_contestants_with_correct_answer().count()
+        return self.get_stats(obj).correct_answers_count
     contestants_correct_answers_count.short_description = _('contestants (at least one correct answer)')
 
     def state(self, obj):
@@ -100,7 +114,22 @@ class ContestAdmin(PublishableAdmin):
                 r'^(\d+)/results-export/all-correct/$',
                 self.admin_site.admin_view(self.correct_results_export_view),
                 name='ella-contests-contest-correct-results-export'
-            )
+            ),
+            url(
+                r'^(\d+)/results-export/all/request/$',
+                self.admin_site.admin_view(self.request_export_view),
+                name='ella-contests-contest-results-export-request'
+            ),
+            url(
+                r'^(\d+)/results-export/all-correct/request/$',
+                self.admin_site.admin_view(self.correct_request_export_view),
+                name='ella-contests-contest-correct-results-export-request'
+            ),
+            url(
+                r'^results-export/(\d+)/download/$',
+                self.admin_site.admin_view(self.export_download_view),
+                name='ella-contests-contest-results-export-download'
+            ),
         ]
         return extra_urls + urls
 
@@ -113,44 +142,177 @@ class ContestAdmin(PublishableAdmin):
         return self.results_export_response(request, contest, all_correct=all_correct)
 
     def results_export_response(self, request, contest, all_correct=False):
-        contest_slug = slugify(contest.title)
-        file_name = "%s_%s" % (
-            contest_slug[:50],
-            datetime.now().strftime("%y_%m_%d_%H_%M")
-        )
+        file_name = get_export_file_name(contest)
 
         if request.GET.get('type') not in self.export_types:
             self.message_user(request, _("Unknown format for export"), level=messages.WARNING)
             return HttpResponseRedirect(reverse("admin:ella_contests_contest_changelist"))
 
-        export_name, export_func = self.export_types[request.GET.get('type')]
+        export_type = request.GET.get('type')
+        export_name, export_func = self.export_types[export_type]
+
+        compression = request.GET.get('compression') or None
+        if compression is not None and compression not in COMPRESSIONS:
+            self.message_user(request, _("Unknown compression for export"), level=messages.WARNING)
+            return HttpResponseRedirect(reverse("admin:ella_contests_contest_changelist"))
+
+        kwargs = {'data_container_class': self.export_data_container_class}
+        if request.GET.get('since', '').isdigit():
+            # export only contestants after the given checkpoint
+            kwargs['since'] = int(request.GET['since'])
+
+        fingerprint = None
+        if contests_settings.EXPORT_CACHE_SIZE:
+            fingerprint = get_export_fingerprint(contest, all_correct, export_type, kwargs.get('since'), compression)
+            response = get_cached_export_response(fingerprint)
+            if response is not None:
+                return response
 
         try:
-            response = export_func(contest, all_correct, file_name, data_container_class=self.export_data_container_class)
-        except self.export_data_container_class.IncorrectHeadData:
-            self.message_user(request, _("I can not export data becouse of any questions has not set choice as correct"), level=messages.WARNING)
+            response = export_func(contest, all_correct, file_name, **kwargs)
+        except self.export_data_container_class.IncorrectHeadData as e:
+            self.message_incorrect_data(request, e)
             return HttpResponseRedirect(reverse("admin:ella_contests_contest_changelist"))
 
+        if compression is not None:
+            response = compress_response(response, compression)
+        if fingerprint is not None:
+            response = cache_export_response(response, contest, fingerprint)
+        return response
+
+    def message_incorrect_data(self, request, e):
+        self.message_user(request, "%s (%s: %s)" % (
+            _("I can not export data becouse of any questions has not set choice as correct"),
+            _('Question'),
+            ", ".join(str(q.order) for q in e.questions)
+        ), level=messages.WARNING)
+
+    def correct_request_export_view(self, *args, **kwargs):
+        kwargs['all_correct'] = True
+        return self.request_export_view(*args, **kwargs)
+
+    def request_export_view(self, request, contest_pk, extra_context=None, all_correct=False):
+        contest = get_cached_object_or_404(Contest, pk=contest_pk)
+        return self.request_export_response(request, contest, all_correct=all_correct)
+
+    def request_export_response(self, request, contest, all_correct=False):
+        """
+        Creates export job processed in background by run_export_jobs command
+        """
+        changelist_url = reverse("admin:ella_contests_contest_changelist")
+        export_type = request.GET.get('type')
+        if export_type not in self.export_types:
+            self.message_user(request, _("Unknown format for export"), level=messages.WARNING)
+            return HttpResponseRedirect(changelist_url)
+
+        compression = request.GET.get('compression') or None
+        if compression is not None and compression not in COMPRESSIONS:
+            self.message_user(request, _("Unknown compression for export"), level=messages.WARNING)
+            return HttpResponseRedirect(changelist_url)
+
+        try:
+            self.export_data_container_class(contest, all_correct).get_head_data()
+        except self.export_data_container_class.IncorrectHeadData as e:
+            self.message_incorrect_data(request, e)
+            return HttpResponseRedirect(changelist_url)
+
+        # job of killed worker would block new requests forever
+        ExportJob.objects.fail_stale(contests_settings.EXPORT_JOB_TIMEOUT)
+        pending = ExportJob.objects.filter(
+            contest=contest,
+            export_type=export_type,
+            all_correct=all_correct,
+            status__in=(ExportJob.STATUS_PENDING, ExportJob.STATUS_RUNNING)
+        )
+        if pending.exists():
+            self.message_user(request, _("Export has been already requested"), level=messages.WARNING)
+            return HttpResponseRedirect(changelist_url)
+
+        since_pk = None
+        if request.GET.get('delta'):
+            since_pk = ExportJob.objects.get_checkpoint(contest, all_correct)
+        # file of the latest job is offered for download in changelist, do
+        # not generate it again while the exported data do not change
+        latest = ExportJob.objects.filter(
+            contest=contest,
+            export_type=export_type,
+            all_correct=all_correct
+        ).order_by('-pk').first()
+        fingerprint = get_export_fingerprint(contest, all_correct, export_type, since_pk, compression)
+        if latest is not None and latest.is_done and latest.fingerprint == fingerprint:
+            self.message_user(request, _("Export is up to date, it can be downloaded right away"))
+        else:
+            ExportJob.objects.create(contest=contest, export_type=export_type, all_correct=all_correct,
+                                     since_pk=since_pk, compression=compression or '')
+            self.message_user(request, _("Export has been requested, it will be available for download when it is done"))
+        return HttpResponseRedirect(changelist_url)
+
+    def export_download_view(self, request, job_pk, extra_context=None):
+        job = get_object_or_404(ExportJob, pk=job_pk, status=ExportJob.STATUS_DONE)
+        response = FileResponse(job.file.storage.open(job.file.name, 'rb'), content_type=job.content_type)
+        response['Content-Disposition'] = 'attachment; filename=%s' % job.file_name
         return response
 
-    def get_safe_url(self, obj, url_name, export_title, export_type):
+    def get_safe_url(self, obj, url_name, export_title, export_type, extra_query=''):
         return mark_safe(
             """
-                <a href='%(url)s?type=%(export_type)s'>%(export_title)s</a>
+                <a href='%(url)s?type=%(export_type)s%(extra_query)s'>%(export_title)s</a>
             """ % {
                 'url': reverse('admin:%s' % url_name, args=(obj.id,)),
                 'export_title': export_title,
                 'export_type': export_type,
+                'extra_query': extra_query,
             }
         )
 
+    def get_job_state(self, job, export_title):
+        if job is None:
+            return ''
+        if job.is_done:
+            return mark_safe(
+                """
+                    <a href='%(url)s'>%(title)s %(export_title)s</a>
+                """ % {
+                    'url': reverse('admin:ella-contests-contest-results-export-download', args=(job.pk,)),
+                    'title': _('download'),
+                    'export_title': export_title,
+                }
+            )
+        if job.is_pending:
+            progress = job.progress
+            return " (%s %s)" % (export_title, _('pending') if progress is None else '%d %%' % progress)
+        return " (%s %s)" % (export_title, _('failed'))
+
     def results_export(self, obj):
-        def get_links(obj, url_name, export_types):
-            return "".join([self.get_safe_url(obj, url_name, name_and_func[0], t) for t, name_and_func in export_types.items()])
+        latest_jobs = {}
+        has_checkpoint = set()
+        jobs = getattr(obj, 'latest_export_jobs', None)
+        if jobs is None:
+            jobs = ExportJob.objects.latest().filter(contest=obj)
+        # export jobs are ordered from the newest one
+        for job in jobs:
+            latest_jobs.setdefault((job.export_type, job.all_correct), job)
+            if job.is_done and job.last_pk is not None:
+                has_checkpoint.add(job.all_correct)
+
+        def get_links(obj, url_name, all_correct):
+            links = []
+            for t, name_and_func in self.export_types.items():
+                links.append(self.get_safe_url(obj, url_name, "%s %s" % (_('request'), name_and_func[0]), t))
+                for compression in sorted(COMPRESSIONS):
+                    links.append(self.get_safe_url(
+                        obj, url_name, "(%s)" % compression, t, '&amp;compression=%s' % compression
+                    ))
+                if all_correct in has_checkpoint:
+                    links.append(self.get_safe_url(
+                        obj, url_name, "%s %s" % (_('new rows'), name_and_func[0]), t, '&amp;delta=1'
+                    ))
+                links.append(self.get_job_state(latest_jobs.get((t, all_correct)), name_and_func[0]))
+            return "".join(links)
 
         items = [
-            "%s: %s" % (_('All'), get_links(obj, "ella-contests-contest-results-export", self.export_types)),
-            "%s: %s" % (_('All correct answers'), get_links(obj, "ella-contests-contest-correct-results-export", self.export_types))
+            "%s: %s" % (_('All'), get_links(obj, "ella-contests-contest-results-export-request", False)),
+            "%s: %s" % (_('All correct answers'), get_links(obj, "ella-contests-contest-correct-results-export-request", True))
         ]
         return mark_safe("<br /><br />".join(items))
     results_export.allow_tags = True
@@ -182,12 +344,39 @@ class QuestionAdmin(admin.ModelAdmin):
 
 
 class ContestantAdmin(admin.ModelAdmin):
-    list_display = ('__str__', 'email', 'created')
-    list_filter = ('contest__title',)
+    list_display = ('__str__', 'email', 'created', 'score', 'all_correct')
+    list_filter = ('contest__title', 'all_correct',)
     search_fields = ('contest__title',)
     raw_id_fields = ('contest', 'user',)
 
 
+class ExportJobAdmin(admin.ModelAdmin):
+    list_display = ('__str__', 'all_correct', 'since_pk', 'last_pk', 'status', 'progress', 'created', 'finished',
+                    'download')
+    list_filter = ('status', 'export_type', 'all_correct')
+    search_fields = ('contest__title',)
+    raw_id_fields = ('contest',)
+    readonly_fields = (
+        'compression', 'status', 'rows_total', 'rows_done', 'since_pk', 'last_pk', 'fingerprint',
+        'file', 'file_name', 'content_type', 'error', 'started', 'finished',
+    )
+
+    def progress(self, obj):
+        progress = obj.progress
+        return '' if progress is None else '%d %%' % progress
+    progress.short_description = _('Progress')
+
+    def download(self, obj):
+        if not obj.is_done:
+            return ''
+        return mark_safe("<a href='%s'>%s</a>" % (
+            reverse('admin:ella-contests-contest-results-export-download', args=(obj.pk,)),
+            _('download'),
+        ))
+    download.allow_tags = True
+    download.short_description = _('File')
+
+
 class AnswerAdmin(admin.ModelAdmin):
     list_display = ('__str__', 'answer',)
     search_fields = ('contestant__name', 'contestant__surname',)
@@ -199,3 +388,4 @@ admin.site.register(Choice, ChoiceAdmin)
 admin.site.register(Contestant, ContestantAdmin)
 admin.site.register(Question, QuestionAdmin)
 admin.site.register(Answer, AnswerAdmin)
+admin.site.register(ExportJob, ExportJobAdmin)
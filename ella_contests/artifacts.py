@@ -0,0 +1,86 @@
+import hashlib
+import logging
+import tempfile
+
+from django.db.models import Count, Max
+from django.http import FileResponse
+
+from ella_contests.models import ExportArtifact, ContestStats
+from ella_contests.exporters import get_response_file_name
+from ella_contests.utils.cache import get_generation
+
+
+log = logging.getLogger('ella_contests.artifacts')
+
+
+def get_export_fingerprint(contest, all_correct, export_type, since=None, compression=None):
+    """
+    Returns fingerprint of export which changes when questions of the
+    contest change, contestants are added or removed or their results
+    change (e.g. rescore or marking of winners)
+    """
+    contestants = contest.contestant_set.aggregate(count=Count('pk'), max_pk=Max('pk'))
+    stats = ContestStats.objects.filter(contest=contest).values_list(
+        'correct_answers_count', 'all_correct_answers_count', 'results_changed'
+    ).first()
+    key = ':'.join(str(i) for i in (
+        contest.pk,
+        get_generation(contest.pk),
+        contestants['max_pk'],
+        contestants['count'],
+        stats,
+        all_correct,
+        export_type,
+        since,
+        compression,
+    ))
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+
+def get_cached_export_response(fingerprint):
+    """
+    Returns response serving stored export with the given fingerprint or
+    None if there is no such export
+    """
+    artifact = ExportArtifact.objects.get_fresh(fingerprint)
+    if artifact is None:
+        return None
+    try:
+        fileobj = artifact.file.storage.open(artifact.file.name, 'rb')
+    except (IOError, OSError):
+        log.warning('File of export artifact %s is missing.', artifact.pk)
+        artifact.delete()
+        return None
+    response = FileResponse(fileobj, content_type=artifact.content_type)
+    response['Content-Disposition'] = 'attachment; filename=%s' % artifact.file_name
+    return response
+
+
+def _iter_and_store(content, contest, fingerprint, file_name, content_type):
+    with tempfile.TemporaryFile() as tmp:
+        for chunk in content:
+            tmp.write(chunk)
+            yield chunk
+        # only exports sent whole are stored, interrupted ones end above
+        tmp.seek(0)
+        ExportArtifact.objects.store(contest, fingerprint, tmp, file_name, content_type)
+
+
+def cache_export_response(response, contest, fingerprint):
+    """
+    Stores content of export response as artifact with the given
+    fingerprint, streaming responses are stored once they are sent whole
+    """
+    file_name = get_response_file_name(response) or fingerprint
+    content_type = response['Content-Type']
+    if not getattr(response, 'streaming', False):
+        with tempfile.TemporaryFile() as tmp:
+            tmp.write(response.content)
+            tmp.seek(0)
+            ExportArtifact.objects.store(contest, fingerprint, tmp, file_name, content_type)
+        return response
+
+    response.streaming_content = _iter_and_store(
+        response.streaming_content, contest, fingerprint, file_name, content_type
+    )
+    return response
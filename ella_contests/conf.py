@@ -6,12 +6,43 @@ RENDER_CHOICES = True
 
 AUTH_USER_MODEL = getattr(settings, "AUTH_USER_MODEL", "auth.User")
 
-QUESTIONS_CACHE_KEY_PATTERN = 'ella_contests_contest_questions:%s'
-CHOICES_CACHE_KEY_PATTERN = 'ella_contests_contest_choices:%s'
+GENERATION_CACHE_KEY_PATTERN = 'ella_contests_contest_generation:%s'
+SNAPSHOT_CACHE_KEY_PATTERN = 'ella_contests_contest_snapshot:%s:%s:%s'
+STATE_CACHE_KEY_PATTERN = 'ella_contests_contest_state:%s:%s'
+
+# seconds the worker recomputing a cached value holds its lock
+CACHE_LOCK_TIMEOUT = 10
+# seconds between polls of workers waiting for the lock holder
+CACHE_LOCK_WAIT = 0.05
+# higher values make early refresh of cached values more eager
+CACHE_EARLY_REFRESH_BETA = 1.0
+# how long the last computed value is served while a new one is computed
+STALE_CACHE_TIMEOUT = 60 * 60 * 24
+
+# count of contests kept in memory of every worker process, 0 disables it
+LOCAL_CACHE_SIZE = 0
+LOCAL_CACHE_TIMEOUT = 60
 
 COOKIE_DOMAIN = settings.SESSION_COOKIE_DOMAIN
 COOKIE_MAX_AGE = 86400 * 31
+# PackedCookieStorage keeps state of a contest in the cache when its cookie
+# value would be longer than this
+COOKIE_MAX_SIZE = 3800
+COOKIE_COMPRESS = True
 
 FORM_STEPS_STORAGE = 'ella_contests.storages.CookieStorage'
 
+# count of contestants read from database at once by exports
+EXPORT_CHUNK_SIZE = 1000
+# seconds after which running export job is considered abandoned by its
+# killed worker and marked as failed, so that it can be requested again
+EXPORT_JOB_TIMEOUT = 60 * 60 * 6
+# seconds finished export jobs and their files are kept, the newest job of
+# every export and jobs holding delta checkpoints are never removed, 0 keeps
+# all jobs
+EXPORT_JOB_RETENTION = 60 * 60 * 24 * 30
+# bytes of export files kept for reuse while their contest does not change,
+# the least recently used ones are removed first, 0 disables it
+EXPORT_CACHE_SIZE = 0
+
 contests_settings = Settings('ella_contests.conf', 'CONTESTS')
@@ -1,30 +1,101 @@
+import collections
 import csv
 import itertools
+import multiprocessing
+import pickle
+import re
+from datetime import datetime
 
+import django
+from django.db import connections
+from django.utils import six
 from django.utils.functional import cached_property
-from django.http import HttpResponse
+from django.http import StreamingHttpResponse
 from django.shortcuts import render_to_response
+from django.template.defaultfilters import slugify
 from django.utils.translation import ugettext_lazy as _
 
-from .models import Choice
+from .conf import contests_settings
+from .models import Answer, Contest
 from .utils import encode_item
+from .utils.compression import iter_gzip, iter_zip
+from .utils.xlsx import iter_xlsx, XLSX_CONTENT_TYPE
+
+
+FILE_NAME_RE = re.compile(r'filename="?([^";]+)"?')
 
 
 class IncorrectData(Exception):
-    pass
+
+    def __init__(self, questions=()):
+        super(IncorrectData, self).__init__(questions)
+        self.questions = questions
 
 
 class ExportDataContainer(object):
     IncorrectHeadData = IncorrectData
 
-    def __init__(self, contest, all_correct=False, encode_item_func=None):
+    # keys of columns which can be selected by columns argument
+    CONSTANT_COLUMNS = (
+        ('name', _('First name')),
+        ('surname', _('Last name')),
+        ('email', _('email')),
+        ('phone_number', _('Phone number')),
+        ('address', _('Address')),
+        ('created', _('Created')),
+        ('score', _('Count of right answers')),
+        ('questions_count', _('Count of all possible right answers')),
+    )
+    ANSWERS_COLUMN = 'answers'
+
+    def __init__(self, contest, all_correct=False, encode_item_func=None, since=None,
+                 created_from=None, created_till=None, winners_only=False, min_score=None, columns=None,
+                 progress_callback=None):
         self.contest = contest
         self.all_correct = all_correct
         self.encode_item_func = encode_item_func or self.blank_encode_item_func
+        # checkpoint of previous export, contestant pk or created datetime
+        self.since = since
+        self.last_pk = since if isinstance(since, six.integer_types) else None
+        self.created_from = created_from
+        self.created_till = created_till
+        self.winners_only = winners_only
+        self.min_score = min_score
+        if columns is not None:
+            unknown = set(columns) - set(self.get_column_keys())
+            if unknown:
+                raise ValueError('Unknown export columns: %s' % ', '.join(sorted(unknown)))
+        self.columns = columns
+        # called with last_pk and count of rows of every exported chunk
+        self.progress_callback = progress_callback
+
+    def get_filters(self):
+        """
+        Returns keyword arguments other than contest and all_correct this
+        container has been created with
+        """
+        return dict(
+            since=self.since,
+            created_from=self.created_from,
+            created_till=self.created_till,
+            winners_only=self.winners_only,
+            min_score=self.min_score,
+            columns=self.columns,
+        )
+
+    @classmethod
+    def get_column_keys(cls):
+        return [key for key, title in cls.CONSTANT_COLUMNS] + [cls.ANSWERS_COLUMN]
+
+    def has_column(self, key):
+        return self.columns is None or key in self.columns
+
+    def get_constant_columns(self):
+        return [(key, title) for key, title in self.CONSTANT_COLUMNS if self.has_column(key)]
 
     @cached_property
     def all_required_questions(self):
-        return self.contest.question_set.filter(is_required=True).count()
+        return self.contest.required_questions_count
 
     @cached_property
     def all_questions(self):
@@ -37,47 +108,65 @@ class ExportDataContainer(object):
         return item
 
     def get_constant_head_data(self):
-        data = [
-            _('First name'),
-            _('Last name'),
-            _('email'),
-            _('Phone number'),
-            _('Address'),
-            _('Created'),
-            _('Count of right answers'),
-            _('Count of all possible right answers'),
-        ]
-        return [self.encode_item_func(i) for i in data]
+        return [self.encode_item_func(title) for key, title in self.get_constant_columns()]
 
     def get_head_data(self):
-        try:
-            head = itertools.chain(
-                self.get_constant_head_data(),
-                [
-                    self.encode_item_func("q %s (%s)" % (q.order, q.choice_set.get(is_correct=True).order))
-                    for q in self.all_questions
-                ]
-            )
-        except Choice.DoesNotExist:
-            raise self.IncorrectData
+        if not self.has_column(self.ANSWERS_COLUMN):
+            return iter(self.get_constant_head_data())
+
+        snapshot = self.contest.snapshot
+        correct_choices = dict((q.pk, snapshot.get_correct_choices(q.pk)) for q in snapshot)
+        incorrect = [q for q in snapshot if len(correct_choices[q.pk]) != 1]
+        if incorrect:
+            raise self.IncorrectHeadData(incorrect)
 
+        head = itertools.chain(
+            self.get_constant_head_data(),
+            [
+                self.encode_item_func("q %s (%s)" % (q.order, correct_choices[q.pk][0].order))
+                for q in snapshot
+            ]
+        )
         return head
 
+    def get_column_value(self, obj, key, right_answers_count):
+        if key == 'created':
+            return obj.created.strftime("%d.%m.%Y %H:%M:%S")
+        if key == 'score':
+            return right_answers_count
+        if key == 'questions_count':
+            return self.all_required_questions
+        return getattr(obj, key)
+
     def get_constant_row_data(self, obj, right_answers_count):
-        data = [
-            obj.name,
-            obj.surname,
-            obj.email,
-            obj.phone_number,
-            obj.address,
-            obj.created.strftime("%d.%m.%Y %H:%M:%S"),
-            right_answers_count,
-            self.all_required_questions,
+        return [
+            self.encode_item_func(self.get_column_value(obj, key, right_answers_count))
+            for key, title in self.get_constant_columns()
         ]
-        return [self.encode_item_func(i) for i in data]
 
-    def get_row_data(self, obj, right_answers_count):
-        answers_dict = dict([(a.choice.question_id, (a.answer, a.choice)) for a in obj.answer_set.all()])
+    @cached_property
+    def all_choices(self):
+        snapshot = self.contest.snapshot
+        return dict((c.pk, c) for q in snapshot for c in snapshot.get_choices(q.pk))
+
+    def get_answers(self, contestant_ids):
+        """
+        Returns dict of contestant pk -> list of (choice pk, answer text)
+        """
+        answers = {}
+        qs = Answer.objects.filter(contestant__in=contestant_ids).values_list('contestant_id', 'choice_id', 'answer')
+        for contestant_id, choice_id, answer in qs:
+            answers.setdefault(contestant_id, []).append((choice_id, answer))
+        return answers
+
+    def get_row_data(self, obj, right_answers_count, answers=None):
+        if answers is None:
+            answers = obj.answer_set.values_list('choice_id', 'answer')
+        answers_dict = {}
+        for choice_id, answer in answers:
+            ch = self.all_choices.get(choice_id)
+            if ch is not None:
+                answers_dict[ch.question_id] = (answer, ch)
         answers = []
         for q in self.all_questions:
             try:
@@ -92,35 +181,287 @@ class ExportDataContainer(object):
 
         return itertools.chain(self.get_constant_row_data(obj, right_answers_count), answers)
 
-    def get_rows_data(self):
-        for obj in self.contest.contestant_set.all():
-            right_answers_count = obj.my_right_answers.count()
-            if self.all_correct and right_answers_count != self.all_required_questions:
-                continue
-            yield self.get_row_data(obj, right_answers_count)
+    def get_contestants(self):
+        qs = self.contest.contestant_set.all()
+        if self.all_correct:
+            qs = qs.filter(all_correct=True)
+        if isinstance(self.since, datetime):
+            qs = qs.filter(created__gt=self.since)
+        elif self.since is not None:
+            qs = qs.filter(pk__gt=self.since)
+        if self.created_from is not None:
+            qs = qs.filter(created__gte=self.created_from)
+        if self.created_till is not None:
+            qs = qs.filter(created__lte=self.created_till)
+        if self.winners_only:
+            qs = qs.filter(winner=True)
+        if self.min_score is not None:
+            qs = qs.filter(score__gte=self.min_score)
+        if self.columns is not None:
+            # read only columns of selected fields
+            fields = set(key for key, title in self.get_constant_columns()) & set(
+                f.name for f in qs.model._meta.fields
+            )
+            # contest is read by related manager to set it on every contestant
+            qs = qs.only('contest', 'score', *fields)
+        return qs
+
+    def get_contestants_chunks(self, pk_range=None):
+        """
+        Yields contestants in pages ordered by primary key, every page is
+        read by its own query starting after the last pk of previous page.
+        The last exported pk is kept in last_pk as checkpoint for the next
+        export. pk_range limits contestants to (after pk, last pk> bounds
+        returned by get_pk_ranges.
+        """
+        chunk_size = contests_settings.EXPORT_CHUNK_SIZE
+        qs = self.get_contestants().order_by('pk')
+        last_pk = None
+        if pk_range is not None:
+            last_pk, max_pk = pk_range
+            qs = qs.filter(pk__lte=max_pk)
+        while True:
+            chunk_qs = qs if last_pk is None else qs.filter(pk__gt=last_pk)
+            chunk = list(chunk_qs[:chunk_size])
+            if chunk:
+                self.last_pk = chunk[-1].pk
+                yield chunk
+                self.chunk_exported(len(chunk))
+            if len(chunk) < chunk_size:
+                break
+            last_pk = chunk[-1].pk
+
+    def chunk_exported(self, count):
+        """
+        Called when count of rows up to last_pk has been consumed
+        """
+        if self.progress_callback is not None:
+            self.progress_callback(self.last_pk, count)
+
+    def get_pk_ranges(self):
+        """
+        Returns list of (after pk, last pk) bounds splitting contestants into
+        chunks of EXPORT_CHUNK_SIZE, only primary keys are read to find them
+        """
+        chunk_size = contests_settings.EXPORT_CHUNK_SIZE
+        qs = self.get_contestants().order_by('pk').values_list('pk', flat=True)
+        ranges = []
+        after_pk = None
+        while True:
+            chunk_qs = qs if after_pk is None else qs.filter(pk__gt=after_pk)
+            bound = list(chunk_qs[chunk_size - 1:chunk_size])
+            if not bound:
+                bound = list(chunk_qs.order_by('-pk')[:1])
+                if bound:
+                    ranges.append((after_pk, bound[0]))
+                return ranges
+            ranges.append((after_pk, bound[0]))
+            after_pk = bound[0]
+
+    def get_rows_data(self, pk_range=None):
+        with_answers = self.has_column(self.ANSWERS_COLUMN)
+        for contestants in self.get_contestants_chunks(pk_range):
+            if with_answers:
+                answers = self.get_answers([obj.pk for obj in contestants])
+                for obj in contestants:
+                    yield self.get_row_data(obj, obj.score, answers.get(obj.pk, []))
+            else:
+                for obj in contestants:
+                    yield self.get_constant_row_data(obj, obj.score)
+
+
+def get_export_file_name(contest):
+    """
+    Returns name of the exported file without extension
+    """
+    return "%s_%s" % (
+        slugify(contest.title)[:50],
+        datetime.now().strftime("%y_%m_%d_%H_%M")
+    )
+
+
+def get_response_file_name(response):
+    """
+    Returns file name from Content-Disposition of export response
+    """
+    match = FILE_NAME_RE.search(response.get('Content-Disposition', ''))
+    return match.group(1) if match else None
+
+
+def write_response(response, fileobj):
+    """
+    Writes content of export response into file object chunk by chunk
+    """
+    if getattr(response, 'streaming', False):
+        for chunk in response.streaming_content:
+            fileobj.write(chunk)
+    else:
+        fileobj.write(response.content)
 
 
-def export_to_csv(contest, all_correct, file_name, data_container_class=None):
+class Echo(object):
+    """
+    File-like object returning whatever is written into it, so csv.writer
+    can be used to format single rows.
+    """
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(head, rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(list(head))
+    for row in rows:
+        yield writer.writerow(list(row))
+
+
+def _get_picklable_class(cls):
+    # worker processes import the class by its name, a class defined in
+    # a function would be replaced by its base there, losing its behaviour
+    try:
+        pickle.dumps(cls)
+    except (pickle.PicklingError, AttributeError, TypeError):
+        raise ValueError('Data container class %s can not be used by export workers, '
+                         'define it on module level' % cls.__name__)
+    return cls
+
+
+def _init_export_worker():
+    django.setup()
+
+
+def _export_csv_partition(args):
+    data_container_class, contest_pk, all_correct, filters, pk_range = args
+    contest = Contest.objects.get(pk=contest_pk)
+    export_container = data_container_class(contest, all_correct, encode_item, **filters)
+    writer = csv.writer(Echo())
+    count = 0
+    data = []
+    for row in export_container.get_rows_data(pk_range):
+        data.append(writer.writerow(list(row)))
+        count += 1
+    return ''.join(data), count
+
+
+def iter_csv_parallel(export_container, head, workers):
+    """
+    Yields CSV lines like iter_csv, rows of contestants are built by
+    a pool of worker processes, every one of them exporting whole pk range
+    at once
+    """
+    writer = csv.writer(Echo())
+    yield writer.writerow(list(head))
+
+    ranges = export_container.get_pk_ranges()
+    if not ranges:
+        return
+
+    data_container_class = _get_picklable_class(export_container.__class__)
+    tasks = (
+        (r, (data_container_class, export_container.contest.pk, export_container.all_correct,
+             export_container.get_filters(), r))
+        for r in ranges
+    )
+    # workers have to open their own database connections instead of
+    # sharing the ones inherited from this process
+    connections.close_all()
+    pool = multiprocessing.Pool(workers, initializer=_init_export_worker)
+    try:
+        pending = collections.deque()
+        # only a few ranges are queued ahead so memory does not grow with
+        # the count of contestants
+        for pk_range, args in itertools.islice(tasks, workers * 2):
+            pending.append((pk_range, pool.apply_async(_export_csv_partition, (args,))))
+        while pending:
+            pk_range, result = pending.popleft()
+            data, count = result.get()
+            for pk_range_next, args in itertools.islice(tasks, 1):
+                pending.append((pk_range_next, pool.apply_async(_export_csv_partition, (args,))))
+            export_container.last_pk = pk_range[1]
+            yield data
+            export_container.chunk_exported(count)
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def export_to_csv(contest, all_correct, file_name, data_container_class=None, workers=1, **filters):
+    """
+    Returns streaming CSV response, rows are built by a pool of worker
+    processes when more than one is requested. Database connections of this
+    process are closed before the pool is started, so use it only outside
+    of transactions (e.g. by the run_export_jobs worker).
+    """
     data_container_class = data_container_class or ExportDataContainer
-    export_container = data_container_class(contest, all_correct, encode_item)
+    export_container = data_container_class(contest, all_correct, encode_item, **filters)
+
+    # head is computed before streaming starts so IncorrectHeadData can
+    # still be handled by the caller
+    head = list(export_container.get_head_data())
+
+    if workers > 1:
+        # unusable data container class is reported before streaming starts
+        _get_picklable_class(data_container_class)
+        content = iter_csv_parallel(export_container, head, workers)
+    else:
+        content = iter_csv(head, export_container.get_rows_data())
 
-    response = HttpResponse(content_type='text/csv')
+    response = StreamingHttpResponse(content, content_type='text/csv')
     response['Content-Disposition'] = 'attachment; filename=%s.csv' % file_name
+    # do not let nginx buffer the whole file before sending it
+    response['X-Accel-Buffering'] = 'no'
+
+    return response
+
 
-    writer = csv.writer(response)
-    writer.writerow(list(export_container.get_head_data()))
+def export_to_xlsx(contest, all_correct, file_name, data_container_class=None, workers=1, **filters):
+    # the workbook is written sequentially, rows are always built by this
+    # process
+    data_container_class = data_container_class or ExportDataContainer
+    # items are not encoded so numbers are written as numeric cells
+    export_container = data_container_class(contest, all_correct, **filters)
+
+    head = list(export_container.get_head_data())
+    rows = itertools.chain([head], export_container.get_rows_data())
 
-    for row in export_container.get_rows_data():
-        writer.writerow(list(row))
+    response = StreamingHttpResponse(iter_xlsx(rows, contest.title), content_type=XLSX_CONTENT_TYPE)
+    response['Content-Disposition'] = 'attachment; filename=%s.xlsx' % file_name
+    response['X-Accel-Buffering'] = 'no'
 
     return response
 
 
-def export_to_xls(contest, all_correct, file_name, data_container_class=None, template_name=None, charset='utf-8'):
+COMPRESSIONS = {
+    'gzip': ('gz', 'application/gzip', lambda chunks, name: iter_gzip(chunks)),
+    'zip': ('zip', 'application/zip', iter_zip),
+}
+
+
+def compress_response(response, compression):
+    """
+    Returns streaming response with content of the export response
+    compressed on the fly by one of COMPRESSIONS
+    """
+    extension, content_type, compress = COMPRESSIONS[compression]
+    file_name = get_response_file_name(response) or 'export'
+    if getattr(response, 'streaming', False):
+        content = response.streaming_content
+    else:
+        content = [response.content]
+
+    compressed_response = StreamingHttpResponse(compress(content, file_name), content_type=content_type)
+    compressed_response['Content-Disposition'] = 'attachment; filename=%s.%s' % (file_name, extension)
+    compressed_response['X-Accel-Buffering'] = 'no'
+    return compressed_response
+
+
+def export_to_xls(contest, all_correct, file_name, data_container_class=None, template_name=None, charset='utf-8',
+                  workers=1, **filters):
     template_name = template_name or 'admin/ella_contests/answers-excel.html'
 
     data_container_class = data_container_class or ExportDataContainer
-    export_container = data_container_class(contest, all_correct, encode_item)
+    export_container = data_container_class(contest, all_correct, encode_item, **filters)
 
     context = {
         'head': export_container.get_head_data(),
@@ -2,8 +2,7 @@ from django import forms
 from django.forms.models import BaseInlineFormSet
 from django.utils.translation import ugettext_lazy as _
 from django import template
-
-from ella.core.cache import get_cached_object
+from django.utils.encoding import smart_text
 
 from ella_contests.storages import storage
 from ella_contests.models import Contestant, Answer, Choice
@@ -33,6 +32,9 @@ def QuestionForm(question):
 
 
 class ContestantForm(forms.ModelForm):
+    error_messages = {
+        'email_used': _("Your email is not unique, you probably competed"),
+    }
 
     class Meta:
         model = Contestant
@@ -50,28 +52,35 @@ class ContestantForm(forms.ModelForm):
         if self.request.user.is_authenticated():
             contestant.user = self.request.user
         if commit:
-            contestant.save()
+            answers = []
+            score = 0
             for q, f in self.qforms:
                 ch_pk = f.cleaned_data['choice']
                 if ch_pk:
+                    ans = ''
                     if isinstance(ch_pk, (tuple, list)):
                         ch_pk, ans = ch_pk
-                        if not q.is_required and not ans.strip():
+                        ans = ans.strip()
+                        if not q.is_required and not ans:
                             continue
-                        data = dict(contestant=contestant,
-                                    choice=get_cached_object(Choice, pk=ch_pk),
-                                    answer=ans.strip())
-                    else:
-                        data = dict(contestant=contestant,
-                                    choice=get_cached_object(Choice, pk=ch_pk))
-                    Answer.objects.create(**data)
+                    # choice has been validated against choices of the question
+                    choice = dict((smart_text(c.pk), c) for c in q.choices)[ch_pk]
+                    if q.is_required and choice.is_right_answer(ans):
+                        score += 1
+                    answers.append(Answer(choice_id=choice.pk, answer=ans))
+            contestant.set_score(score)
+            contestant.save()
+            for a in answers:
+                a.contestant = contestant
+            Answer.objects.bulk_create(answers)
         return contestant
 
     def _questions_valid(self):
         qforms = []
         forms_are_valid = True
+        all_data = storage.get_all_data(self.contest, self.request)
         for question in self.contest.questions:
-            data = storage.get_data(self.contest, question.pk, self.request)
+            data = all_data.get(question.pk)
             form = QuestionForm(question)(data)
             if data is None or not form.is_valid():
                 forms_are_valid = False
@@ -81,10 +90,22 @@ class ContestantForm(forms.ModelForm):
         self.view_instance.questions_data_invalid = not forms_are_valid
         return forms_are_valid
 
+    def clean_email(self):
+        return Contestant.normalize_email(self.cleaned_data['email'])
+
+    def is_email_used(self, email):
+        return Contestant.objects.filter(contest=self.contest, email=email).exists()
+
+    def add_email_used_error(self):
+        self.add_error(None, self.error_messages['email_used'])
+
     def clean(self):
         email = self.cleaned_data.get('email', None)
-        if email and Contestant.objects.filter(email=email, contest=self.contest).count() > 0:
-            raise forms.ValidationError(_("Your email is not unique, you probably competed"))
+        if email and self.is_email_used(email):
+            raise forms.ValidationError(self.error_messages['email_used'])
+        # answers are validated and scored against the current choices, not
+        # against the cached snapshot which may be stale
+        self.contest.refresh_snapshot()
         if not self._questions_valid():
             raise forms.ValidationError(_("Some of the questions are filled incorrect"))
         return self.cleaned_data
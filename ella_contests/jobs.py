@@ -0,0 +1,105 @@
+import logging
+import tempfile
+
+from django.core.files import File
+from django.utils.encoding import force_text
+
+from ella.utils.timezone import now
+
+from ella_contests.conf import contests_settings
+from ella_contests.models import ExportJob, ExportArtifact
+from ella_contests.exporters import get_export_file_name, get_response_file_name, write_response, compress_response
+from ella_contests.artifacts import get_export_fingerprint
+
+
+log = logging.getLogger('ella_contests.jobs')
+
+
+def get_progress_callback(job):
+    """
+    Returns progress callback of data container storing count of exported
+    rows and the last exported pk into the job after every chunk of contestants
+    """
+    def progress_callback(last_pk, count):
+        job.last_pk = last_pk
+        job.update_progress(job.rows_done + count)
+
+    return progress_callback
+
+
+def run_export_job(job, export_func, data_container_class, workers=1):
+    """
+    Generates file of claimed export job by export_func (one of
+    ContestAdmin.export_types) and stores it in the job, delta jobs only
+    export contestants after the checkpoint in since_pk. Rows are built
+    by given count of worker processes where export_func supports it.
+    The generated file is compressed by the requested compression and also
+    stored as export artifact, so the same export requested directly is
+    not generated again.
+    """
+    kwargs = {
+        'data_container_class': data_container_class,
+        'progress_callback': get_progress_callback(job),
+        'workers': workers,
+    }
+    if job.is_delta:
+        kwargs['since'] = job.since_pk
+    job.last_pk = job.since_pk
+    try:
+        contestants = data_container_class(job.contest, job.all_correct, since=job.since_pk).get_contestants()
+        job.update_progress(0, contestants.count())
+        # computed before the export so contestants added meanwhile change
+        # the fingerprint of the next request
+        job.fingerprint = get_export_fingerprint(job.contest, job.all_correct, job.export_type, job.since_pk,
+                                                 job.compression or None)
+        response = export_func(job.contest, job.all_correct, get_export_file_name(job.contest), **kwargs)
+        if job.compression:
+            response = compress_response(response, job.compression)
+        file_name = get_response_file_name(response) or '%s.%s' % (get_export_file_name(job.contest), job.export_type)
+
+        with tempfile.TemporaryFile() as tmp:
+            write_response(response, tmp)
+            tmp.seek(0)
+            job.file.save(file_name, File(tmp), save=False)
+            if contests_settings.EXPORT_CACHE_SIZE:
+                tmp.seek(0)
+                ExportArtifact.objects.store(job.contest, job.fingerprint, tmp, file_name, response['Content-Type'])
+    except data_container_class.IncorrectHeadData as e:
+        job.status = ExportJob.STATUS_FAILED
+        job.error = 'Questions without exactly one correct choice: %s' % ", ".join(str(q.order) for q in e.questions)
+    except Exception as e:
+        log.exception('Export job %s failed.', job.pk)
+        job.status = ExportJob.STATUS_FAILED
+        job.error = force_text(repr(e))
+    else:
+        job.status = ExportJob.STATUS_DONE
+        job.file_name = file_name
+        job.content_type = response['Content-Type']
+    job.finished = now()
+    job.save()
+    return job
+
+
+def run_pending_jobs(export_types, data_container_class, limit=None, workers=1):
+    """
+    Runs pending export jobs from the oldest one, returns count of the
+    jobs processed by this worker. Abandoned running jobs are marked as
+    failed and expired jobs are deleted first.
+    """
+    ExportJob.objects.fail_stale(contests_settings.EXPORT_JOB_TIMEOUT)
+    ExportJob.objects.delete_expired(contests_settings.EXPORT_JOB_RETENTION)
+    count = 0
+    for job in ExportJob.objects.filter(status=ExportJob.STATUS_PENDING).order_by('created', 'pk'):
+        if limit is not None and count >= limit:
+            break
+        if not ExportJob.objects.claim(job):
+            continue
+        if job.export_type not in export_types:
+            job.status = ExportJob.STATUS_FAILED
+            job.error = 'Unknown export type %s' % job.export_type
+            job.finished = now()
+            job.save()
+        else:
+            run_export_job(job, export_types[job.export_type][1], data_container_class, workers)
+        count += 1
+    return count
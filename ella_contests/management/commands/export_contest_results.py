@@ -0,0 +1,96 @@
+from datetime import datetime, time
+
+from django.conf import settings
+from django.contrib import admin
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from ella_contests.admin import ContestAdmin
+from ella_contests.exporters import COMPRESSIONS, compress_response, get_export_file_name, write_response
+from ella_contests.models import Contest
+
+
+def parse_moment(value, end_of_day=False):
+    moment = parse_datetime(value)
+    if moment is None:
+        date = parse_date(value)
+        if date is None:
+            raise CommandError('Invalid date or datetime: %s' % value)
+        moment = datetime.combine(date, time.max if end_of_day else time.min)
+    if settings.USE_TZ and timezone.is_naive(moment):
+        moment = timezone.make_aware(moment, timezone.get_current_timezone())
+    return moment
+
+
+class Command(BaseCommand):
+    help = 'Exports results of contest into file without going through admin.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('contest_id', type=int)
+        parser.add_argument('output', help='Path of the written file.')
+        parser.add_argument('--format', dest='export_type', default='csv', help='One of admin export types.')
+        parser.add_argument('--compression', dest='compression', choices=sorted(COMPRESSIONS), default=None)
+        parser.add_argument('--all-correct', action='store_true', dest='all_correct', default=False,
+                            help='Only contestants with all answers correct.')
+        parser.add_argument('--winners', action='store_true', dest='winners_only', default=False,
+                            help='Only contestants marked as winners.')
+        parser.add_argument('--min-score', type=int, dest='min_score', default=None,
+                            help='Only contestants with at least this count of right answers.')
+        parser.add_argument('--from', dest='created_from', default=None,
+                            help='Only contestants created at this date (or datetime) or later.')
+        parser.add_argument('--till', dest='created_till', default=None,
+                            help='Only contestants created at this date (or datetime) or earlier.')
+        parser.add_argument('--since', type=int, dest='since', default=None,
+                            help='Only contestants with pk greater than this checkpoint.')
+        parser.add_argument('--columns', dest='columns', default=None,
+                            help='Comma separated keys of exported columns.')
+        parser.add_argument('--workers', type=int, dest='workers', default=1,
+                            help='Count of processes building rows of CSV export.')
+
+    def get_model_admin(self):
+        return admin.site._registry.get(Contest) or ContestAdmin(Contest, admin.site)
+
+    def handle(self, *args, **options):
+        model_admin = self.get_model_admin()
+        data_container_class = model_admin.export_data_container_class
+        try:
+            contest = Contest.objects.get(pk=options['contest_id'])
+        except Contest.DoesNotExist:
+            raise CommandError('Contest %s does not exist' % options['contest_id'])
+        if options['export_type'] not in model_admin.export_types:
+            raise CommandError('Unknown format %s, use one of: %s' % (
+                options['export_type'], ', '.join(sorted(model_admin.export_types))
+            ))
+        export_name, export_func = model_admin.export_types[options['export_type']]
+
+        filters = {}
+        for name in ('since', 'min_score'):
+            if options[name] is not None:
+                filters[name] = options[name]
+        if options['winners_only']:
+            filters['winners_only'] = True
+        if options['created_from']:
+            filters['created_from'] = parse_moment(options['created_from'])
+        if options['created_till']:
+            filters['created_till'] = parse_moment(options['created_till'], end_of_day=True)
+        if options['columns']:
+            filters['columns'] = [c.strip() for c in options['columns'].split(',') if c.strip()]
+
+        try:
+            response = export_func(contest, options['all_correct'], get_export_file_name(contest),
+                                   data_container_class=data_container_class, workers=options['workers'], **filters)
+        except data_container_class.IncorrectHeadData as e:
+            raise CommandError('Questions without exactly one correct choice: %s' % (
+                ', '.join(str(q.order) for q in e.questions)
+            ))
+        except ValueError as e:
+            raise CommandError(str(e))
+        if options['compression']:
+            response = compress_response(response, options['compression'])
+
+        with open(options['output'], 'wb') as f:
+            write_response(response, f)
+
+        if int(options['verbosity']) > 1:
+            self.stdout.write('Results of contest %s written to %s' % (contest.pk, options['output']))
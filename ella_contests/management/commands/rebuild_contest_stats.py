@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from ella_contests.models import Contest, ContestStats
+from ella_contests.utils import transaction
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds aggregated stats of contests (all of them if no contest id is given).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('contest_ids', nargs='*', type=int)
+        parser.add_argument(
+            '--rescore',
+            action='store_true',
+            dest='rescore',
+            default=False,
+            help='Recompute score of every contestant from stored answers first.'
+        )
+
+    def handle(self, *args, **options):
+        contests = Contest.objects.all()
+        if options['contest_ids']:
+            contests = contests.filter(pk__in=options['contest_ids'])
+
+        for contest in contests.iterator():
+            with transaction.atomic():
+                if options['rescore']:
+                    contest.rescore()
+                stats = ContestStats.objects.rebuild(contest)
+            if int(options['verbosity']) > 1:
+                self.stdout.write('%s: %d contestants, %d with correct answer, %d all correct' % (
+                    contest.pk,
+                    stats.contestants_count,
+                    stats.correct_answers_count,
+                    stats.all_correct_answers_count,
+                ))
@@ -0,0 +1,63 @@
+import time
+
+from django.contrib import admin
+from django.core.management.base import BaseCommand
+
+from ella_contests.admin import ContestAdmin
+from ella_contests.jobs import run_pending_jobs
+from ella_contests.models import Contest
+
+
+class Command(BaseCommand):
+    help = 'Generates files of pending contest export jobs requested in admin.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            dest='loop',
+            default=False,
+            help='Keep waiting for new jobs instead of exiting when there are none.'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            dest='interval',
+            default=5,
+            help='Seconds between checks for new jobs with --loop.'
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            dest='limit',
+            default=None,
+            help='Maximal count of jobs processed by single check.'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            dest='workers',
+            default=1,
+            help='Count of processes building rows of CSV exports.'
+        )
+
+    def get_model_admin(self):
+        # use registered admin so customized export types and data container
+        # are used by the worker as well
+        return admin.site._registry.get(Contest) or ContestAdmin(Contest, admin.site)
+
+    def handle(self, *args, **options):
+        model_admin = self.get_model_admin()
+        while True:
+            count = run_pending_jobs(
+                model_admin.export_types,
+                model_admin.export_data_container_class,
+                limit=options['limit'],
+                workers=options['workers']
+            )
+            if int(options['verbosity']) > 1 and count:
+                self.stdout.write('%d export jobs processed' % count)
+            if not options['loop']:
+                break
+            if not count:
+                time.sleep(options['interval'])
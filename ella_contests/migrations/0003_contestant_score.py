@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+def compute_scores(apps, schema_editor):
+    Question = apps.get_model('ella_contests', 'Question')
+    Choice = apps.get_model('ella_contests', 'Choice')
+    Answer = apps.get_model('ella_contests', 'Answer')
+    Contestant = apps.get_model('ella_contests', 'Contestant')
+
+    for contest_id in Contestant.objects.values_list('contest_id', flat=True).distinct():
+        required = Question.objects.filter(contest_id=contest_id, is_required=True).count()
+        right_choices = Choice.objects.filter(question__contest_id=contest_id,
+                                              question__is_required=True,
+                                              is_correct=True)
+        scores = Answer.objects.filter(choice__in=right_choices)\
+            .exclude(answer='', choice__inserted_by_user=True)\
+            .values('contestant_id').annotate(score=models.Count('id'))
+        for row in scores:
+            Contestant.objects.filter(pk=row['contestant_id']).update(
+                score=row['score'],
+                all_correct=0 < row['score'] == required
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ella_contests', '0002_auto_20150506_1502'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contestant',
+            name='score',
+            field=models.PositiveIntegerField(default=0, verbose_name='Count of right answers', editable=False),
+        ),
+        migrations.AddField(
+            model_name='contestant',
+            name='all_correct',
+            field=models.BooleanField(default=False, verbose_name='All answers correct', editable=False),
+        ),
+        migrations.AlterIndexTogether(
+            name='contestant',
+            index_together=set([('contest', 'score', 'created')]),
+        ),
+        migrations.RunPython(compute_scores, migrations.RunPython.noop),
+    ]
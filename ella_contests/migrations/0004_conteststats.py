@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+def compute_stats(apps, schema_editor):
+    Contest = apps.get_model('ella_contests', 'Contest')
+    ContestStats = apps.get_model('ella_contests', 'ContestStats')
+
+    for contest in Contest.objects.all():
+        contestants = contest.contestant_set.all()
+        ContestStats.objects.create(
+            contest=contest,
+            contestants_count=contestants.count(),
+            correct_answers_count=contestants.filter(score__gt=0).count(),
+            all_correct_answers_count=contestants.filter(all_correct=True).count(),
+            last_submission=contestants.aggregate(last=models.Max('created'))['last'],
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ella_contests', '0003_contestant_score'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContestStats',
+            fields=[
+                ('contest', models.OneToOneField(related_name='stats', primary_key=True, serialize=False, to='ella_contests.Contest', verbose_name='Contest')),
+                ('contestants_count', models.PositiveIntegerField(default=0, verbose_name='count of contestants')),
+                ('correct_answers_count', models.PositiveIntegerField(default=0, verbose_name='contestants (at least one correct answer)')),
+                ('all_correct_answers_count', models.PositiveIntegerField(default=0, verbose_name='contestants (all correct answers)')),
+                ('last_submission', models.DateTimeField(null=True, verbose_name='Last submission', blank=True)),
+            ],
+            options={
+                'verbose_name': 'Contest stats',
+                'verbose_name_plural': 'Contest stats',
+            },
+            bases=(models.Model,),
+        ),
+        migrations.RunPython(compute_stats, migrations.RunPython.noop),
+    ]
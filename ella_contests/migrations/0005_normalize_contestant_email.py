@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+def normalize_emails(apps, schema_editor):
+    Contestant = apps.get_model('ella_contests', 'Contestant')
+
+    for pk, contest_id, email in Contestant.objects.values_list('pk', 'contest_id', 'email').iterator():
+        normalized = email.strip().lower()
+        if normalized == email:
+            continue
+        # keep emails differing only in case, they have competed already
+        if Contestant.objects.filter(contest_id=contest_id, email=normalized).exists():
+            continue
+        Contestant.objects.filter(pk=pk).update(email=normalized)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ella_contests', '0004_conteststats'),
+    ]
+
+    operations = [
+        migrations.RunPython(normalize_emails, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+import ella.core.cache.fields
+import ella.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ella_contests', '0005_normalize_contestant_email'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExportJob',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('export_type', models.CharField(max_length=20, verbose_name='Export type')),
+                ('all_correct', models.BooleanField(default=False, verbose_name='All correct answers only')),
+                ('status', models.PositiveSmallIntegerField(default=0, verbose_name='Status', choices=[(0, 'Pending'), (1, 'Running'), (2, 'Done'), (3, 'Failed')])),
+                ('rows_total', models.PositiveIntegerField(null=True, verbose_name='Rows total', blank=True)),
+                ('rows_done', models.PositiveIntegerField(default=0, verbose_name='Rows done')),
+                ('file', models.FileField(upload_to='ella_contests/exports/%Y/%m', verbose_name='File', blank=True)),
+                ('file_name', models.CharField(max_length=200, verbose_name='File name', blank=True)),
+                ('content_type', models.CharField(max_length=100, verbose_name='Content type', blank=True)),
+                ('error', models.TextField(verbose_name='Error', blank=True)),
+                ('created', models.DateTimeField(default=ella.utils.timezone.now, verbose_name='Created', editable=False)),
+                ('started', models.DateTimeField(null=True, verbose_name='Started', blank=True)),
+                ('finished', models.DateTimeField(null=True, verbose_name='Finished', blank=True)),
+                ('contest', ella.core.cache.fields.CachedForeignKey(related_name='export_jobs', verbose_name='Contest', to='ella_contests.Contest')),
+            ],
+            options={
+                'ordering': ('-created',),
+                'verbose_name': 'Export job',
+                'verbose_name_plural': 'Export jobs',
+            },
+            bases=(models.Model,),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ella_contests', '0006_exportjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exportjob',
+            name='since_pk',
+            field=models.PositiveIntegerField(null=True, verbose_name='Exported after contestant', blank=True),
+        ),
+        migrations.AddField(
+            model_name='exportjob',
+            name='last_pk',
+            field=models.PositiveIntegerField(null=True, verbose_name='Last exported contestant', blank=True),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+import ella.core.cache.fields
+import ella.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ella_contests', '0007_exportjob_checkpoint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExportArtifact',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('fingerprint', models.CharField(unique=True, max_length=40, verbose_name='Fingerprint')),
+                ('file', models.FileField(upload_to='ella_contests/export_cache/%Y/%m', verbose_name='File')),
+                ('file_name', models.CharField(max_length=200, verbose_name='File name')),
+                ('content_type', models.CharField(max_length=100, verbose_name='Content type')),
+                ('size', models.PositiveIntegerField(default=0, verbose_name='Size')),
+                ('created', models.DateTimeField(default=ella.utils.timezone.now, verbose_name='Created', editable=False)),
+                ('last_used', models.DateTimeField(default=ella.utils.timezone.now, verbose_name='Last used', db_index=True)),
+                ('contest', ella.core.cache.fields.CachedForeignKey(related_name='export_artifacts', verbose_name='Contest', to='ella_contests.Contest')),
+            ],
+            options={
+                'verbose_name': 'Export artifact',
+                'verbose_name_plural': 'Export artifacts',
+            },
+            bases=(models.Model,),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ella_contests', '0008_exportartifact'),
+    ]
+
+    operations = [
+        migrations.AlterIndexTogether(
+            name='contestant',
+            index_together=set([('contest', 'score', 'created'), ('contest', 'id')]),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ella_contests', '0010_exportjob_fingerprint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exportjob',
+            name='compression',
+            field=models.CharField(max_length=10, verbose_name='Compression', blank=True),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ella_contests', '0011_exportjob_compression'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conteststats',
+            name='results_changed',
+            field=models.DateTimeField(null=True, verbose_name='Results changed', blank=True),
+        ),
+    ]
@@ -1,22 +1,42 @@
 from __future__ import unicode_literals
 
-from django.db import models
+from datetime import timedelta
+
+from django.core.files import File
+from django.db import models, router, IntegrityError
+from django.db.models import F
 from django.utils.encoding import python_2_unicode_compatible
 from django.utils.translation import ugettext_lazy as _
-from django.db.models.signals import post_save, post_delete
+from django.db.models.signals import post_init, post_save, post_delete
 from django.dispatch import receiver
-from django.core.cache import cache
 
 from ella.core.models import Publishable
 from ella.photos.models import Photo
-from ella.core.cache import CachedForeignKey, cache_this
+from ella.core.cache import CachedForeignKey
 from ella.core.custom_urls import resolver
 
 from ella_contests.conf import contests_settings
+from ella_contests.snapshot import ContestSnapshot, QuestionData, ChoiceData
+from ella_contests.utils import transaction
+from ella_contests.utils.cache import (
+    get_generation,
+    get_contest_key,
+    get_stale_contest_key,
+    bump_generation,
+    cache_this,
+    local_cache,
+)
 
 from ella.utils.timezone import now
 
 
+def _instance_from_data(model, **values):
+    obj = model(**values)
+    obj._state.adding = False
+    obj._state.db = router.db_for_read(model)
+    return obj
+
+
 class Contest(Publishable):
     text = models.TextField(_('Text'))
     text_results = models.TextField(_('Text with results'), blank=True)
@@ -29,17 +49,74 @@ class Contest(Publishable):
         verbose_name_plural = _('Contests')
         ordering = ('-active_from',)
 
+    @cache_this(lambda c: get_contest_key(contests_settings.SNAPSHOT_CACHE_KEY_PATTERN, c.pk,
+                                          ContestSnapshot.FORMAT_VERSION),
+                lambda c: get_stale_contest_key(contests_settings.SNAPSHOT_CACHE_KEY_PATTERN, c.pk,
+                                                ContestSnapshot.FORMAT_VERSION))
+    def _load_snapshot(self):
+        return ContestSnapshot.from_rows(
+            self.question_set.order_by('order').values_list(*QuestionData.__slots__),
+            Choice.objects.filter(question__contest=self).order_by('order').values_list(*ChoiceData.__slots__)
+        ).dumps()
+
+    def _get_snapshot(self):
+        if not contests_settings.LOCAL_CACHE_SIZE:
+            return ContestSnapshot.loads(self._load_snapshot())
+        generation = get_generation(self.pk)
+        snapshot = local_cache.get(self.pk, generation)
+        if snapshot is None:
+            payload, stale = Contest._load_snapshot.lookup(self)
+            snapshot = ContestSnapshot.loads(payload)
+            # stale value belongs to an older generation, it must not be
+            # kept locally as the current one
+            if not stale:
+                local_cache.set(self.pk, generation, snapshot)
+        return snapshot
+
+    @property
+    def snapshot(self):
+        """
+        All questions and choices of the contest loaded at once
+        """
+        if not hasattr(self, '_snapshot'):
+            self._snapshot = self._get_snapshot()
+        return self._snapshot
+
+    def refresh_snapshot(self):
+        """
+        Replaces snapshot of this instance by questions and choices read from
+        the database with one query, bypassing the cache and its stale value
+        """
+        question_fields = len(QuestionData.__slots__)
+        choice_fields = tuple('choice__%s' % f for f in ChoiceData.__slots__)
+        rows = self.question_set.order_by('order', 'choice__order').values_list(
+            *(QuestionData.__slots__ + choice_fields)
+        )
+        questions = []
+        choices = []
+        for row in rows:
+            if not questions or questions[-1][0] != row[0]:
+                questions.append(row[:question_fields])
+            if row[question_fields] is not None:
+                choices.append(row[question_fields:])
+        self._snapshot = ContestSnapshot.from_rows(questions, choices)
+        self.__dict__.pop('_questions', None)
+        return self._snapshot
+
     @property
-    @cache_this(lambda q: contests_settings.QUESTIONS_CACHE_KEY_PATTERN % q.pk)
     def questions(self):
-        return list(self.question_set.order_by('order'))
+        if not hasattr(self, '_questions'):
+            self._questions = [Question.from_data(self, q) for q in self.snapshot]
+            for position, q in enumerate(self._questions, 1):
+                q._position = position
+        return self._questions
 
     def __getitem__(self, key):
         return self.questions[key]
 
     @property
     def questions_count(self):
-        return len(self.questions)
+        return len(self.snapshot)
 
     @property
     def right_choices(self):
@@ -51,14 +128,54 @@ class Contest(Publishable):
         return Answer.objects.filter(choice__id__in=self.right_choices).exclude(answer="",
                                                                                 choice__inserted_by_user=True)
 
+    @property
+    def required_questions_count(self):
+        return len([q for q in self.snapshot if q.is_required])
+
     def get_contestants_with_correct_answer(self):
         """
-        Returns queryset of contestants with correct answers on the current
-        contest
+        Returns queryset of contestants with at least one correct answer on
+        the current contest ordered by their score, annotated with the score
+        as answers_count
+        """
+        return self.contestant_set.filter(score__gt=0).annotate(answers_count=F('score'))\
+            .order_by('-answers_count', 'created')
+
+    def get_contestants_with_all_correct_answers(self):
+        """
+        Returns queryset of contestants with all required questions answered
+        correctly on the current contest
+        """
+        return self.contestant_set.filter(all_correct=True).order_by('created')
+
+    def rescore(self):
+        """
+        Recomputes score and all correct flag of every contestant from the
+        stored answers and the current answer key by a few bulk updates and
+        rebuilds stats of the contest
         """
-        qs = Contestant.objects.filter(answer__id__in=self.right_answers)\
-            .annotate(answers_count=models.Count('answer')).order_by('-answers_count', 'created')
-        return qs
+        contestants = self.contestant_set.all()
+        last_pk = contestants.aggregate(last_pk=models.Max('pk'))['last_pk']
+        if last_pk is None:
+            return
+        required_count = self.question_set.filter(is_required=True).count()
+        scores = {}
+        for contestant_id, score in self.right_answers.values_list('contestant').annotate(models.Count('pk')):
+            scores.setdefault(score, []).append(contestant_id)
+
+        with transaction.atomic():
+            # contestants submitted meanwhile have been scored by the new key
+            contestants.filter(pk__lte=last_pk).update(score=0, all_correct=False)
+            for score, pks in scores.items():
+                # sqlite limits count of parameters of single query
+                for i in range(0, len(pks), 500):
+                    Contestant.objects.filter(pk__in=pks[i:i + 500]).update(
+                        score=score,
+                        all_correct=score == required_count
+                    )
+            # stats of contest being deleted may be gone already
+            if ContestStats.objects.filter(contest=self).exists():
+                ContestStats.objects.rebuild(self)
 
     @property
     def content(self):
@@ -106,6 +223,9 @@ class Question(models.Model):
     text = models.TextField()
     is_required = models.BooleanField(_('Is required'), default=True, db_index=True)
 
+    # fields deciding scores of contestants
+    ANSWER_KEY_FIELDS = ('contest_id', 'is_required')
+
     def __str__(self):
         return '%s - %s %d' % (
             self.contest if self.contest_id else 'Contest',
@@ -119,10 +239,28 @@ class Question(models.Model):
         ordering = ('order',)
         unique_together = (('contest', 'order', ),)
 
+    @classmethod
+    def from_data(cls, contest, data):
+        """
+        Returns question built from QuestionData of the contest snapshot
+        """
+        question = _instance_from_data(
+            cls,
+            id=data.pk,
+            contest_id=contest.pk,
+            order=data.order,
+            text=data.text,
+            is_required=data.is_required,
+            photo_id=data.photo_id
+        )
+        setattr(question, cls._meta.get_field('contest').get_cache_name(), contest)
+        return question
+
     @property
-    @cache_this(lambda q: contests_settings.CHOICES_CACHE_KEY_PATTERN % q.pk)
     def choices(self):
-        return list(self.choice_set.order_by('order'))
+        if not hasattr(self, '_choices'):
+            self._choices = [Choice.from_data(self, c) for c in self.contest.snapshot.get_choices(self.pk)]
+        return self._choices
 
     def get_absolute_url(self):
         return resolver.reverse(self.contest, 'ella-contests-contests-detail', question_number=self.position)
@@ -130,7 +268,10 @@ class Question(models.Model):
     @property
     def position(self):
         if not hasattr(self, '_position'):
-            self._position = self.contest.question_set.filter(order__lte=self.order).count()
+            self._position = self.contest.snapshot.get_position(self.order)
+            if self._position is None:
+                # question is not in the cached snapshot of its contest yet
+                self._position = self.contest.question_set.filter(order__lte=self.order).count()
         return self._position
 
     @property
@@ -156,6 +297,9 @@ class Choice(models.Model):
     is_correct = models.BooleanField(_('Is correct'), default=False, db_index=True)
     inserted_by_user = models.BooleanField(_('Answare inserted by user'), default=False)
 
+    # fields deciding scores of contestants
+    ANSWER_KEY_FIELDS = ('question_id', 'is_correct', 'inserted_by_user')
+
     def __str__(self):
         return '%s: choice (%d)' % (self.question if self.question_id else 'Choice', self.order)
 
@@ -165,6 +309,30 @@ class Choice(models.Model):
         ordering = ('order',)
         unique_together = (('question', 'order', ),)
 
+    @classmethod
+    def from_data(cls, question, data):
+        """
+        Returns choice built from ChoiceData of the contest snapshot
+        """
+        choice = _instance_from_data(
+            cls,
+            id=data.pk,
+            question_id=question.pk,
+            choice=data.choice,
+            order=data.order,
+            is_correct=data.is_correct,
+            inserted_by_user=data.inserted_by_user
+        )
+        setattr(choice, cls._meta.get_field('question').get_cache_name(), question)
+        return choice
+
+    def is_right_answer(self, answer=''):
+        """
+        Returns True if selecting this choice (with the given text for choices
+        inserted by user) counts as a correct answer
+        """
+        return self.is_correct and not (self.inserted_by_user and not answer)
+
 
 @python_2_unicode_compatible
 class Contestant(models.Model):
@@ -181,11 +349,14 @@ class Contestant(models.Model):
     phone_number = models.CharField(_('Phone number'), max_length=20, blank=True)
     winner = models.BooleanField(_('Winner'), default=False)
     created = models.DateTimeField(_('Created'), editable=False)
+    score = models.PositiveIntegerField(_('Count of right answers'), default=0, editable=False)
+    all_correct = models.BooleanField(_('All answers correct'), default=False, editable=False)
 
     class Meta:
         verbose_name = _('Contestant')
         verbose_name_plural = _('Contestants')
         unique_together = (('contest', 'email',),)
+        index_together = (('contest', 'score', 'created',), ('contest', 'id',),)
         ordering = ('-created',)
 
     def __str__(self):
@@ -194,12 +365,35 @@ class Contestant(models.Model):
     def save(self, **kwargs):
         if not self.id:
             self.created = now()
+        self.email = self.normalize_email(self.email)
         super(Contestant, self).save(**kwargs)
 
+    @staticmethod
+    def normalize_email(email):
+        """
+        Emails are stored lowercased so the unique index on contest and email
+        is case insensitive
+        """
+        return (email or '').strip().lower()
+
     @property
     def my_right_answers(self):
         return self.contest.right_answers.filter(contestant=self)
 
+    def set_score(self, score):
+        self.score = score
+        self.all_correct = 0 < score == self.contest.required_questions_count
+
+    def update_score(self, commit=True):
+        """
+        Recomputes score of the contestant from its stored answers
+        """
+        old_score, old_all_correct = self.score, self.all_correct
+        self.set_score(self.my_right_answers.count())
+        if commit:
+            Contestant.objects.filter(pk=self.pk).update(score=self.score, all_correct=self.all_correct)
+            ContestStats.objects.change_score(self, old_score, old_all_correct)
+
     def get_my_text_answers(self):
         return self.answer_set.exclude(choice__inserted_by_user=False)
 
@@ -222,15 +416,407 @@ class Answer(models.Model):
         unique_together = (('contestant', 'choice',),)
 
 
+class ContestStatsManager(models.Manager):
+
+    def _get_increments(self, contestant, sign=1):
+        return dict(
+            contestants_count=F('contestants_count') + sign,
+            correct_answers_count=F('correct_answers_count') + (sign if contestant.score > 0 else 0),
+            all_correct_answers_count=F('all_correct_answers_count') + (sign if contestant.all_correct else 0),
+        )
+
+    def add_contestant(self, contestant):
+        """
+        Counts newly created contestant into the stats of its contest
+        """
+        values = self._get_increments(contestant)
+        values['last_submission'] = contestant.created
+        if self.filter(contest=contestant.contest_id).update(**values):
+            return
+        try:
+            with transaction.atomic():
+                self.create(
+                    contest_id=contestant.contest_id,
+                    contestants_count=1,
+                    correct_answers_count=1 if contestant.score > 0 else 0,
+                    all_correct_answers_count=1 if contestant.all_correct else 0,
+                    last_submission=contestant.created
+                )
+        except IntegrityError:
+            # stats row has been created by concurrent submission
+            self.filter(contest=contestant.contest_id).update(**values)
+
+    def remove_contestant(self, contestant):
+        self.filter(contest=contestant.contest_id).update(**self._get_increments(contestant, sign=-1))
+
+    def change_score(self, contestant, old_score, old_all_correct):
+        """
+        Moves rescored contestant between the correct answers counters
+        """
+        if (contestant.score, contestant.all_correct) == (old_score, old_all_correct):
+            return
+        correct = int(contestant.score > 0) - int(old_score > 0)
+        all_correct = int(contestant.all_correct) - int(old_all_correct)
+        self.filter(contest=contestant.contest_id).update(
+            correct_answers_count=F('correct_answers_count') + correct,
+            all_correct_answers_count=F('all_correct_answers_count') + all_correct,
+            results_changed=now(),
+        )
+
+    def touch(self, contest_id):
+        """
+        Marks results of existing contestants of the contest as changed
+        """
+        self.filter(contest=contest_id).update(results_changed=now())
+
+    def rebuild(self, contest):
+        """
+        Recomputes stats of the contest from its contestants
+        """
+        contestants = contest.contestant_set.all()
+        stats, created = self.update_or_create(contest=contest, defaults=dict(
+            contestants_count=contestants.count(),
+            correct_answers_count=contestants.filter(score__gt=0).count(),
+            all_correct_answers_count=contestants.filter(all_correct=True).count(),
+            last_submission=contestants.aggregate(last=models.Max('created'))['last'],
+            results_changed=now(),
+        ))
+        return stats
+
+
+@python_2_unicode_compatible
+class ContestStats(models.Model):
+    """
+    Contest aggregates maintained on every submission.
+    """
+    contest = models.OneToOneField(Contest, primary_key=True, related_name='stats', verbose_name=_('Contest'))
+    contestants_count = models.PositiveIntegerField(_('count of contestants'), default=0)
+    correct_answers_count = models.PositiveIntegerField(_('contestants (at least one correct answer)'), default=0)
+    all_correct_answers_count = models.PositiveIntegerField(_('contestants (all correct answers)'), default=0)
+    last_submission = models.DateTimeField(_('Last submission'), blank=True, null=True)
+    # scores, flags or details of existing contestants changed, so their
+    # exports change as well
+    results_changed = models.DateTimeField(_('Results changed'), blank=True, null=True)
+
+    objects = ContestStatsManager()
+
+    def __str__(self):
+        return '%s: %s' % (
+            self.contest if self.contest_id else 'Contest',
+            _('Stats'),
+        )
+
+    class Meta:
+        verbose_name = _('Contest stats')
+        verbose_name_plural = _('Contest stats')
+
+
+class ExportJobManager(models.Manager):
+
+    def claim(self, job):
+        """
+        Marks pending job as running, returns False if another worker has
+        claimed it already
+        """
+        started = now()
+        if not self.filter(pk=job.pk, status=ExportJob.STATUS_PENDING).update(
+                status=ExportJob.STATUS_RUNNING, started=started):
+            return False
+        job.status = ExportJob.STATUS_RUNNING
+        job.started = started
+        return True
+
+    def fail_stale(self, timeout):
+        """
+        Marks jobs running for more than timeout seconds as failed, their
+        worker has most likely been killed
+        """
+        if not timeout:
+            return 0
+        return self.filter(
+            status=ExportJob.STATUS_RUNNING,
+            started__lt=now() - timedelta(seconds=timeout)
+        ).update(
+            status=ExportJob.STATUS_FAILED,
+            error='Export has not finished in time, its worker has probably been killed',
+            finished=now()
+        )
+
+    def _latest_pks(self):
+        # pks of the newest job of every export and of the newest finished
+        # job with checkpoint of every contest
+        newest = self.order_by().values('contest', 'export_type', 'all_correct')\
+            .annotate(newest=models.Max('pk')).values_list('newest', flat=True)
+        checkpoints = self.order_by().filter(status=ExportJob.STATUS_DONE, last_pk__isnull=False)\
+            .values('contest', 'all_correct').annotate(newest=models.Max('pk')).values_list('newest', flat=True)
+        return newest, checkpoints
+
+    def latest(self):
+        """
+        Returns the newest job of every export and the newest job holding
+        checkpoint for delta exports
+        """
+        newest, checkpoints = self._latest_pks()
+        return self.filter(models.Q(pk__in=newest) | models.Q(pk__in=checkpoints))
+
+    def delete_expired(self, retention):
+        """
+        Deletes jobs finished more than retention seconds ago together with
+        their files, jobs returned by latest are kept
+        """
+        if not retention:
+            return 0
+        newest, checkpoints = self._latest_pks()
+        expired = self.filter(
+            status__in=(ExportJob.STATUS_DONE, ExportJob.STATUS_FAILED),
+            finished__lt=now() - timedelta(seconds=retention)
+        ).exclude(pk__in=newest).exclude(pk__in=checkpoints)
+        count = 0
+        for job in expired.iterator():
+            job.delete()
+            count += 1
+        return count
+
+    def get_checkpoint(self, contest, all_correct=False):
+        """
+        Returns pk of the last contestant exported by finished export of the
+        contest or None if there is no such export
+        """
+        checkpoints = self.filter(
+            contest=contest,
+            all_correct=all_correct,
+            status=ExportJob.STATUS_DONE,
+            last_pk__isnull=False
+        ).order_by('-last_pk').values_list('last_pk', flat=True)[:1]
+        return checkpoints[0] if checkpoints else None
+
+
+@python_2_unicode_compatible
+class ExportJob(models.Model):
+    """
+    Export of contest results generated in background.
+    """
+    STATUS_PENDING = 0
+    STATUS_RUNNING = 1
+    STATUS_DONE = 2
+    STATUS_FAILED = 3
+    STATUS_CHOICES = (
+        (STATUS_PENDING, _('Pending')),
+        (STATUS_RUNNING, _('Running')),
+        (STATUS_DONE, _('Done')),
+        (STATUS_FAILED, _('Failed')),
+    )
+
+    contest = CachedForeignKey(Contest, related_name='export_jobs', verbose_name=_('Contest'))
+    export_type = models.CharField(_('Export type'), max_length=20)
+    all_correct = models.BooleanField(_('All correct answers only'), default=False)
+    # one of exporters.COMPRESSIONS or empty for uncompressed file
+    compression = models.CharField(_('Compression'), max_length=10, blank=True)
+    status = models.PositiveSmallIntegerField(_('Status'), choices=STATUS_CHOICES, default=STATUS_PENDING)
+    rows_total = models.PositiveIntegerField(_('Rows total'), null=True, blank=True)
+    rows_done = models.PositiveIntegerField(_('Rows done'), default=0)
+    since_pk = models.PositiveIntegerField(_('Exported after contestant'), null=True, blank=True)
+    last_pk = models.PositiveIntegerField(_('Last exported contestant'), null=True, blank=True)
+    # fingerprint of the exported data, see artifacts.get_export_fingerprint
+    fingerprint = models.CharField(_('Fingerprint'), max_length=40, blank=True)
+    file = models.FileField(_('File'), upload_to='ella_contests/exports/%Y/%m', blank=True)
+    file_name = models.CharField(_('File name'), max_length=200, blank=True)
+    content_type = models.CharField(_('Content type'), max_length=100, blank=True)
+    error = models.TextField(_('Error'), blank=True)
+    created = models.DateTimeField(_('Created'), default=now, editable=False)
+    started = models.DateTimeField(_('Started'), null=True, blank=True)
+    finished = models.DateTimeField(_('Finished'), null=True, blank=True)
+
+    objects = ExportJobManager()
+
+    class Meta:
+        verbose_name = _('Export job')
+        verbose_name_plural = _('Export jobs')
+        ordering = ('-created',)
+
+    def __str__(self):
+        return '%s: %s' % (
+            self.contest if self.contest_id else 'Contest',
+            self.export_type,
+        )
+
+    @property
+    def is_delta(self):
+        return self.since_pk is not None
+
+    @property
+    def is_pending(self):
+        return self.status in (self.STATUS_PENDING, self.STATUS_RUNNING)
+
+    @property
+    def is_done(self):
+        return self.status == self.STATUS_DONE
+
+    @property
+    def progress(self):
+        """
+        Returns percentage of exported rows or None if it is not known yet
+        """
+        if self.is_done:
+            return 100
+        if not self.rows_total:
+            return None
+        return min(100, self.rows_done * 100 // self.rows_total)
+
+    def update_progress(self, rows_done, rows_total=None):
+        self.rows_done = rows_done
+        values = {'rows_done': rows_done}
+        if rows_total is not None:
+            self.rows_total = values['rows_total'] = rows_total
+        ExportJob.objects.filter(pk=self.pk).update(**values)
+
+
+class ExportArtifactManager(models.Manager):
+
+    def get_fresh(self, fingerprint):
+        """
+        Returns artifact with the given fingerprint marked as just used or
+        None if there is no such artifact
+        """
+        try:
+            artifact = self.get(fingerprint=fingerprint)
+        except ExportArtifact.DoesNotExist:
+            return None
+        artifact.last_used = now()
+        self.filter(pk=artifact.pk).update(last_used=artifact.last_used)
+        return artifact
+
+    def store(self, contest, fingerprint, fileobj, file_name, content_type):
+        """
+        Stores content of fileobj as artifact with the given fingerprint and
+        evicts the least recently used artifacts over EXPORT_CACHE_SIZE
+        """
+        artifact = self.model(
+            contest=contest,
+            fingerprint=fingerprint,
+            file_name=file_name,
+            content_type=content_type,
+        )
+        artifact.file.save(file_name, File(fileobj), save=False)
+        artifact.size = artifact.file.size
+        try:
+            with transaction.atomic():
+                artifact.save(force_insert=True)
+        except IntegrityError:
+            # the same export has been stored by concurrent request
+            artifact.file.delete(save=False)
+            return None
+        self.evict(contests_settings.EXPORT_CACHE_SIZE)
+        return artifact
+
+    def evict(self, max_size):
+        total = self.aggregate(total=models.Sum('size'))['total'] or 0
+        for artifact in self.order_by('last_used').iterator():
+            if total <= max_size:
+                break
+            total -= artifact.size
+            artifact.delete()
+
+
+@python_2_unicode_compatible
+class ExportArtifact(models.Model):
+    """
+    Generated export file reused while the contest does not change.
+    """
+    fingerprint = models.CharField(_('Fingerprint'), max_length=40, unique=True)
+    contest = CachedForeignKey(Contest, related_name='export_artifacts', verbose_name=_('Contest'))
+    file = models.FileField(_('File'), upload_to='ella_contests/export_cache/%Y/%m')
+    file_name = models.CharField(_('File name'), max_length=200)
+    content_type = models.CharField(_('Content type'), max_length=100)
+    size = models.PositiveIntegerField(_('Size'), default=0)
+    created = models.DateTimeField(_('Created'), default=now, editable=False)
+    last_used = models.DateTimeField(_('Last used'), default=now, db_index=True)
+
+    objects = ExportArtifactManager()
+
+    class Meta:
+        verbose_name = _('Export artifact')
+        verbose_name_plural = _('Export artifacts')
+
+    def __str__(self):
+        return self.file_name
+
+
+@receiver(post_delete, sender=ExportJob)
+@receiver(post_delete, sender=ExportArtifact)
+def delete_export_file(sender, instance, **kwargs):
+    if instance.file:
+        instance.file.delete(save=False)
+
+
+@receiver(post_save, sender=Contestant)
+def update_stats_on_contestant_save(sender, instance, created, **kwargs):
+    if not getattr(instance, 'contest_id', None):
+        return
+    # counted however the contestant is created, so that deleting it
+    # never takes the counters below the real count
+    if created:
+        ContestStats.objects.add_contestant(instance)
+    else:
+        ContestStats.objects.touch(instance.contest_id)
+
+
+@receiver(post_delete, sender=Contestant)
+def update_stats_on_contestant_delete(sender, instance, **kwargs):
+    if getattr(instance, 'contest_id', None):
+        ContestStats.objects.remove_contestant(instance)
+
+
+@receiver(post_delete, sender=Contest)
+@receiver(post_save, sender=Contest)
+def invalidate_contest_cache(sender, instance, **kwargs):
+    bump_generation(instance.pk)
+
+
+def _get_answer_key(instance):
+    # deferred fields are not loaded just to be remembered
+    return tuple(instance.__dict__.get(f) for f in instance.ANSWER_KEY_FIELDS)
+
+
+@receiver(post_init, sender=Question)
+@receiver(post_init, sender=Choice)
+def remember_answer_key(sender, instance, **kwargs):
+    instance._answer_key = _get_answer_key(instance)
+
+
+def _answer_key_changed(instance, created=True, raw=False, **kwargs):
+    """
+    Returns the answer key instance has been loaded with and whether it has
+    been changed by this save or delete, fixtures are loaded as they are
+    """
+    old_key, instance._answer_key = instance._answer_key, _get_answer_key(instance)
+    return old_key, not raw and (created or old_key != instance._answer_key)
+
+
+def _rescore_contests(contest_ids):
+    for contest in Contest.objects.filter(pk__in=contest_ids):
+        contest.rescore()
+
+
 @receiver(post_delete, sender=Question)
 @receiver(post_save, sender=Question)
 def invalidate_question_cache(sender, instance, **kwargs):
-    if getattr(instance, 'contest_id', None):
-        cache.delete(contests_settings.QUESTIONS_CACHE_KEY_PATTERN % instance.contest_id)
+    old_key, changed = _answer_key_changed(instance, **kwargs)
+    contest_ids = set(pk for pk in (old_key[0], instance.contest_id) if pk)
+    for contest_id in contest_ids:
+        bump_generation(contest_id)
+    if changed:
+        # scores are stored with contestants, they follow the answer key
+        _rescore_contests(contest_ids)
 
 
 @receiver(post_delete, sender=Choice)
 @receiver(post_save, sender=Choice)
 def invalidate_choices_cache(sender, instance, **kwargs):
-    if getattr(instance, 'question_id', None):
-        cache.delete(contests_settings.CHOICES_CACHE_KEY_PATTERN % instance.question_id)
+    old_key, changed = _answer_key_changed(instance, **kwargs)
+    question_ids = set(pk for pk in (old_key[0], instance.question_id) if pk)
+    contest_ids = set(Question.objects.filter(pk__in=question_ids).values_list('contest_id', flat=True))
+    for contest_id in contest_ids:
+        bump_generation(contest_id)
+    if changed:
+        _rescore_contests(contest_ids)
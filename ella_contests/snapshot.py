@@ -0,0 +1,107 @@
+import marshal
+
+
+class ValueObject(object):
+    """
+    Compact immutable record with fields listed in __slots__.
+    """
+    __slots__ = ()
+
+    def __init__(self, *args):
+        for name, value in zip(self.__slots__, args):
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("%s is immutable" % self.__class__.__name__)
+
+    def __delattr__(self, name):
+        raise AttributeError("%s is immutable" % self.__class__.__name__)
+
+    def __eq__(self, other):
+        return self.__class__ is other.__class__ and self.as_tuple() == other.as_tuple()
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self.as_tuple())
+
+    def __reduce__(self):
+        return (self.__class__, self.as_tuple())
+
+    def __repr__(self):
+        return '%s%r' % (self.__class__.__name__, self.as_tuple())
+
+    def as_tuple(self):
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+
+class QuestionData(ValueObject):
+    __slots__ = ('pk', 'order', 'text', 'is_required', 'photo_id')
+
+
+class ChoiceData(ValueObject):
+    __slots__ = ('pk', 'question_id', 'order', 'choice', 'is_correct', 'inserted_by_user')
+
+
+class ContestSnapshot(object):
+    """
+    Ordered questions of a contest together with their ordered choices.
+    """
+    # bump when fields of the value objects change so that payloads cached
+    # by the previous version are refused instead of misread
+    FORMAT_VERSION = 1
+
+    def __init__(self, questions, choices):
+        self.questions = questions
+        self.choices = choices
+        self.positions = dict((q.order, i) for i, q in enumerate(questions, 1))
+
+    def __getitem__(self, key):
+        return self.questions[key]
+
+    def __iter__(self):
+        return iter(self.questions)
+
+    def __len__(self):
+        return len(self.questions)
+
+    def get_choices(self, question_pk):
+        return self.choices.get(question_pk, ())
+
+    def get_correct_choices(self, question_pk):
+        return [c for c in self.get_choices(question_pk) if c.is_correct]
+
+    def get_position(self, order):
+        """
+        Returns 1-based position of the question with the given order or
+        None if there is no such question
+        """
+        return self.positions.get(order)
+
+    @classmethod
+    def from_rows(cls, question_rows, choice_rows):
+        """
+        Builds snapshot from rows of values ordered as the fields of
+        QuestionData and ChoiceData
+        """
+        questions = tuple(QuestionData(*row) for row in question_rows)
+        choices = {}
+        for row in choice_rows:
+            choice = ChoiceData(*row)
+            choices.setdefault(choice.question_id, []).append(choice)
+        return cls(questions, dict((k, tuple(v)) for k, v in choices.items()))
+
+    def dumps(self):
+        return marshal.dumps((
+            self.FORMAT_VERSION,
+            [q.as_tuple() for q in self.questions],
+            [c.as_tuple() for q in self.questions for c in self.get_choices(q.pk)],
+        ))
+
+    @classmethod
+    def loads(cls, data):
+        version, question_rows, choice_rows = marshal.loads(data)
+        if version != cls.FORMAT_VERSION:
+            raise ValueError('Unsupported contest snapshot format %r' % version)
+        return cls.from_rows(question_rows, choice_rows)
@@ -1,4 +1,8 @@
 import json
+import uuid
+
+from django.core import signing
+from django.core.cache import cache
 from django.core.exceptions import ImproperlyConfigured
 
 from ella.utils import import_module_member
@@ -18,7 +22,27 @@ class BaseStorage(object):
         pass
 
     def remove_all_data(self, contest, response, *args, **kwargs):
-        pass
+        """
+        Removes answers and the last step of the contest, override when
+        the storage can do it at once
+        """
+        self.remove_last_step(contest, response, *args, **kwargs)
+        for q in contest.questions:
+            self.remove_data(contest, q.pk, response, *args, **kwargs)
+
+    def get_all_data(self, contest, request, *args, **kwargs):
+        """
+        Returns dict of question pk -> data for all questions of the contest,
+        override when the storage can read them at once
+        """
+        return dict((q.pk, self.get_data(contest, q.pk, request, *args, **kwargs)) for q in contest.questions)
+
+    def set_step_data(self, contest, question, data, step, response, *args, **kwargs):
+        """
+        Stores data of the question together with the last step
+        """
+        self.set_data(contest, question, data, response, *args, **kwargs)
+        self.set_last_step(contest, step, response, *args, **kwargs)
 
     def remove_last_step(self, contest, response, *args, **kwargs):
         pass
@@ -88,6 +112,173 @@ class CookieStorage(BaseStorage):
                                    domain=self.cookie_domain)
 
 
+class StateStorage(BaseStorage):
+    """
+    Keeps answers and the last step of a contest together as one state
+    dict loaded and saved at once by subclasses. Methods changing the state
+    expect request in kwargs to read the state stored before.
+    """
+
+    def load_state(self, contest, request=None, response=None):
+        """
+        Returns state of the contest, state already set to response takes
+        precedence over the one sent with request
+        """
+        raise NotImplementedError("Override load_state in %s!" % self.__class__.__name__)
+
+    def save_state(self, contest, state, response, request=None):
+        raise NotImplementedError("Override save_state in %s!" % self.__class__.__name__)
+
+    def delete_state(self, contest, response, request=None):
+        raise NotImplementedError("Override delete_state in %s!" % self.__class__.__name__)
+
+    def set_data(self, contest, question, data, response, *args, **kwargs):
+        request = kwargs.get('request')
+        state = self.load_state(contest, request, response)
+        state.setdefault('a', {})[str(question)] = data
+        self.save_state(contest, state, response, request)
+
+    def get_data(self, contest, question, request, *args, **kwargs):
+        return self.load_state(contest, request).get('a', {}).get(str(question))
+
+    def remove_data(self, contest, question, response, *args, **kwargs):
+        request = kwargs.get('request')
+        state = self.load_state(contest, request, response)
+        state.get('a', {}).pop(str(question), None)
+        self.save_state(contest, state, response, request)
+
+    def set_last_step(self, contest, step, response, *args, **kwargs):
+        request = kwargs.get('request')
+        state = self.load_state(contest, request, response)
+        state['s'] = step
+        self.save_state(contest, state, response, request)
+
+    def get_last_step(self, contest, request, *args, **kwargs):
+        return self.load_state(contest, request).get('s')
+
+    def get_all_data(self, contest, request, *args, **kwargs):
+        answers = self.load_state(contest, request).get('a', {})
+        return dict((q.pk, answers.get(str(q.pk))) for q in contest.questions)
+
+    def set_step_data(self, contest, question, data, step, response, *args, **kwargs):
+        request = kwargs.get('request')
+        state = self.load_state(contest, request, response)
+        state.setdefault('a', {})[str(question)] = data
+        state['s'] = step
+        self.save_state(contest, state, response, request)
+
+    def remove_last_step(self, contest, response, *args, **kwargs):
+        request = kwargs.get('request')
+        state = self.load_state(contest, request, response)
+        state.pop('s', None)
+        self.save_state(contest, state, response, request)
+
+    def remove_all_data(self, contest, response, *args, **kwargs):
+        self.delete_state(contest, response, kwargs.get('request'))
+
+
+def _get_cookie_value(name, request=None, response=None):
+    if response is not None and name in response.cookies:
+        return response.cookies[name].value
+    if request is not None:
+        return request.COOKIES.get(name)
+    return None
+
+
+class CacheStorage(StateStorage):
+    """
+    Keeps state of a contest in the cache under random token sent in
+    a cookie, so the cookie stays short no matter how many questions
+    the contest has.
+    """
+    cookie_name = 'contest_%s_token'
+    cookie_domain = contests_settings.COOKIE_DOMAIN
+    cookie_max_age = contests_settings.COOKIE_MAX_AGE
+    cache_key_pattern = contests_settings.STATE_CACHE_KEY_PATTERN
+
+    def _get_cookie_name(self, contest):
+        return self.cookie_name % contest.pk
+
+    def _get_cache_key(self, contest, token):
+        return self.cache_key_pattern % (contest.pk, token)
+
+    def _get_token(self, contest, request=None, response=None):
+        token = _get_cookie_value(self._get_cookie_name(contest), request, response)
+        # anything else than the token format is ignored so the client can
+        # not choose arbitrary cache key
+        if token and len(token) == 32 and token.isalnum():
+            return token
+        return None
+
+    def load_state(self, contest, request=None, response=None):
+        token = self._get_token(contest, request, response)
+        if token is None:
+            return {}
+        return cache.get(self._get_cache_key(contest, token)) or {}
+
+    def save_state(self, contest, state, response, request=None):
+        token = self._get_token(contest, request, response) or uuid.uuid4().hex
+        cache.set(self._get_cache_key(contest, token), state, self.cookie_max_age)
+        response.set_cookie(
+            self._get_cookie_name(contest),
+            token,
+            domain=self.cookie_domain,
+            max_age=self.cookie_max_age
+        )
+
+    def delete_state(self, contest, response, request=None):
+        token = self._get_token(contest, request, response)
+        if token is not None:
+            cache.delete(self._get_cache_key(contest, token))
+        response.delete_cookie(self._get_cookie_name(contest), domain=self.cookie_domain)
+
+
+class PackedCookieStorage(CacheStorage):
+    """
+    Keeps state of a contest in one signed cookie, the state which would
+    not fit into the cookie is kept in the cache like by CacheStorage and
+    the cookie holds only its signed token.
+    """
+    cookie_name = 'contest_%s'
+    cookie_max_size = contests_settings.COOKIE_MAX_SIZE
+    compress = contests_settings.COOKIE_COMPRESS
+    salt = 'ella_contests.storages.PackedCookieStorage'
+
+    def _load_payload(self, contest, request=None, response=None):
+        value = _get_cookie_value(self._get_cookie_name(contest), request, response)
+        if not value:
+            return {}
+        try:
+            return signing.loads(value, salt=self.salt, max_age=self.cookie_max_age)
+        except signing.BadSignature:
+            return {}
+
+    def _get_token(self, contest, request=None, response=None):
+        return self._load_payload(contest, request, response).get('k')
+
+    def load_state(self, contest, request=None, response=None):
+        payload = self._load_payload(contest, request, response)
+        if 'k' in payload:
+            return cache.get(self._get_cache_key(contest, payload['k'])) or {}
+        return payload
+
+    def save_state(self, contest, state, response, request=None):
+        token = self._get_token(contest, request, response)
+        value = signing.dumps(state, salt=self.salt, compress=self.compress)
+        if len(value) > self.cookie_max_size:
+            token = token or uuid.uuid4().hex
+            cache.set(self._get_cache_key(contest, token), state, self.cookie_max_age)
+            value = signing.dumps({'k': token}, salt=self.salt)
+        elif token is not None:
+            cache.delete(self._get_cache_key(contest, token))
+        response.set_cookie(
+            self._get_cookie_name(contest),
+            value,
+            domain=self.cookie_domain,
+            max_age=self.cookie_max_age
+        )
+
+
 def get_storage_class():
     class_storage = import_module_member(contests_settings.FORM_STEPS_STORAGE, 'form steps storage')
     if not issubclass(class_storage, BaseStorage):
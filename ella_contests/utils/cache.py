@@ -0,0 +1,205 @@
+import logging
+import math
+import threading
+from collections import OrderedDict
+from random import random
+from time import time, sleep
+
+from django.core.cache import cache
+
+from ella.core.cache.utils import CACHE_TIMEOUT
+
+from ella_contests.conf import contests_settings
+
+
+log = logging.getLogger('ella_contests.utils.cache')
+
+
+class LocalCache(object):
+    """
+    Size bounded LRU cache living in memory of the worker process. Values
+    are stored with a version and are only returned for the same version.
+    Size and timeout not given are read from settings whenever they are used.
+    """
+
+    def __init__(self, max_size=None, timeout=None):
+        self._max_size = max_size
+        self._timeout = timeout
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def max_size(self):
+        return contests_settings.LOCAL_CACHE_SIZE if self._max_size is None else self._max_size
+
+    @property
+    def timeout(self):
+        return contests_settings.LOCAL_CACHE_TIMEOUT if self._timeout is None else self._timeout
+
+    def get(self, key, version):
+        with self._lock:
+            try:
+                value, value_version, expiry = self._data.pop(key)
+            except KeyError:
+                return None
+            if value_version != version or expiry < time():
+                return None
+            self._data[key] = (value, value_version, expiry)
+            return value
+
+    def set(self, key, version, value):
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = (value, version, time() + self.timeout)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+local_cache = LocalCache()
+
+
+def _get_generation_key(contest_pk):
+    return contests_settings.GENERATION_CACHE_KEY_PATTERN % contest_pk
+
+
+def _initial_generation():
+    # start from the current time so an evicted counter never goes back
+    # to a generation which may still have values cached
+    return int(time() * 1000)
+
+
+def get_generation(contest_pk):
+    """
+    Returns current cache generation of the contest
+    """
+    key = _get_generation_key(contest_pk)
+    generation = cache.get(key)
+    if generation is None:
+        generation = _initial_generation()
+        if not cache.add(key, generation, timeout=None):
+            generation = cache.get(key) or generation
+    return generation
+
+
+def bump_generation(contest_pk):
+    """
+    Moves the contest to the next cache generation, so all cache keys built
+    by get_contest_key for the previous one are not used anymore
+    """
+    key = _get_generation_key(contest_pk)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        generation = _initial_generation()
+        cache.set(key, generation, timeout=None)
+        return generation
+
+
+def get_contest_key(pattern, contest_pk, *args):
+    """
+    Returns cache key built from the pattern with contest pk, its current
+    generation and the rest of args
+    """
+    return pattern % ((contest_pk, get_generation(contest_pk)) + args)
+
+
+def get_stale_contest_key(pattern, contest_pk, *args):
+    """
+    Returns generation independent cache key holding the last value computed
+    for the contest
+    """
+    return pattern % ((contest_pk, 'stale') + args)
+
+
+def _get_lock_key(key):
+    return '%s:lock' % key
+
+
+def _acquire_lock(key):
+    return cache.add(_get_lock_key(key), 1, contests_settings.CACHE_LOCK_TIMEOUT)
+
+
+def _release_lock(key):
+    cache.delete(_get_lock_key(key))
+
+
+def _should_refresh(delta, expiry):
+    # probabilistic early expiration: the closer to expiry and the longer
+    # the computation took, the more likely one of the readers refreshes it
+    # before it expires for everybody
+    return time() - delta * contests_settings.CACHE_EARLY_REFRESH_BETA * math.log(1 - random()) >= expiry
+
+
+def _wait_for_value(key):
+    waited = 0
+    while waited < contests_settings.CACHE_LOCK_TIMEOUT:
+        sleep(contests_settings.CACHE_LOCK_WAIT)
+        waited += contests_settings.CACHE_LOCK_WAIT
+        entry = cache.get(key)
+        if entry is not None:
+            return entry
+    return None
+
+
+def cache_this(key_getter, stale_key_getter=None, timeout=CACHE_TIMEOUT):
+    """
+    Like ella.core.cache.cache_this, but only one worker at a time computes
+    a missing value while the others wait for it or get the stale value
+    stored under the key returned by stale_key_getter. Values are also
+    refreshed by single worker shortly before they expire.
+
+    The decorated function has lookup attribute returning the value
+    together with a flag telling whether it is the stale one.
+    """
+    def wrapped_decorator(func):
+        def compute(key, stale_key, *args, **kwargs):
+            start = time()
+            result = func(*args, **kwargs)
+            delta = time() - start
+            entry = (result, delta, time() + timeout)
+            cache.set(key, entry, timeout)
+            if stale_key is not None:
+                cache.set(stale_key, entry, contests_settings.STALE_CACHE_TIMEOUT)
+            return result
+
+        def lookup(*args, **kwargs):
+            key = key_getter(*args, **kwargs)
+            stale_key = stale_key_getter(*args, **kwargs) if stale_key_getter else None
+
+            entry = cache.get(key)
+            if entry is not None:
+                result, delta, expiry = entry
+                if not _should_refresh(delta, expiry) or not _acquire_lock(key):
+                    return result, False
+                log.debug('cache_this(key=%s), refreshing object early.', key)
+            elif not _acquire_lock(key):
+                entry = cache.get(stale_key) if stale_key is not None else None
+                if entry is not None:
+                    return entry[0], True
+                entry = _wait_for_value(key)
+                if entry is not None:
+                    return entry[0], False
+                log.warning('cache_this(key=%s), lock wait timed out.', key)
+                return compute(key, stale_key, *args, **kwargs), False
+            else:
+                log.debug('cache_this(key=%s), object not cached.', key)
+
+            try:
+                return compute(key, stale_key, *args, **kwargs), False
+            finally:
+                _release_lock(key)
+
+        def wrapped_func(*args, **kwargs):
+            return lookup(*args, **kwargs)[0]
+
+        wrapped_func.__dict__ = func.__dict__
+        wrapped_func.lookup = lookup
+        wrapped_func.__doc__ = func.__doc__
+        wrapped_func.__name__ = func.__name__
+
+        return wrapped_func
+    return wrapped_decorator
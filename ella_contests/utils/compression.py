@@ -0,0 +1,109 @@
+"""
+Gzip and zip compression of content streamed as bytes chunks, the output
+is produced while the chunks are read without buffering the whole content.
+"""
+import struct
+import time
+import zlib
+
+from django.utils.encoding import force_text
+
+
+ZIP_VERSION = 20
+ZIP_FLAGS = 0x08 | 0x800  # sizes in data descriptor, utf-8 names
+ZIP_DEFLATED = 8
+
+
+def _dos_datetime(timestamp):
+    t = time.localtime(timestamp)
+    dos_time = (t.tm_hour << 11) | (t.tm_min << 5) | (t.tm_sec // 2)
+    dos_date = ((t.tm_year - 1980) << 9) | (t.tm_mon << 5) | t.tm_mday
+    return dos_time, dos_date
+
+
+class ZipStream(object):
+    """
+    Writes zip archive sequentially without seeking back, sizes and crc of
+    every member are stored in the data descriptor following its data.
+    """
+
+    def __init__(self, compresslevel=6):
+        self.compresslevel = compresslevel
+        self.members = []
+        self.offset = 0
+        self.dos_time, self.dos_date = _dos_datetime(time.time())
+
+    def _out(self, data):
+        self.offset += len(data)
+        return data
+
+    def write(self, name, chunks):
+        """
+        Yields bytes of the archive member with the given name and content
+        read from chunks iterable
+        """
+        name = force_text(name).encode('utf-8')
+        header_offset = self.offset
+        yield self._out(struct.pack(
+            '<IHHHHHIIIHH',
+            0x04034b50, ZIP_VERSION, ZIP_FLAGS, ZIP_DEFLATED, self.dos_time, self.dos_date,
+            0, 0, 0, len(name), 0
+        ) + name)
+
+        crc = 0
+        size = 0
+        compressed_size = 0
+        compressor = zlib.compressobj(self.compresslevel, zlib.DEFLATED, -zlib.MAX_WBITS)
+        for chunk in chunks:
+            crc = zlib.crc32(chunk, crc)
+            size += len(chunk)
+            data = compressor.compress(chunk)
+            if data:
+                compressed_size += len(data)
+                yield self._out(data)
+        data = compressor.flush()
+        compressed_size += len(data)
+        crc &= 0xffffffff
+        yield self._out(data + struct.pack('<IIII', 0x08074b50, crc, compressed_size, size))
+
+        self.members.append((name, crc, compressed_size, size, header_offset))
+
+    def close(self):
+        """
+        Yields central directory of the archive
+        """
+        directory_offset = self.offset
+        for name, crc, compressed_size, size, header_offset in self.members:
+            yield self._out(struct.pack(
+                '<IHHHHHHIIIHHHHHII',
+                0x02014b50, ZIP_VERSION, ZIP_VERSION, ZIP_FLAGS, ZIP_DEFLATED, self.dos_time, self.dos_date,
+                crc, compressed_size, size, len(name), 0, 0, 0, 0, 0, header_offset
+            ) + name)
+        yield self._out(struct.pack(
+            '<IHHHHIIH',
+            0x06054b50, 0, 0, len(self.members), len(self.members),
+            self.offset - directory_offset, directory_offset, 0
+        ))
+
+
+def iter_zip(chunks, name):
+    """
+    Yields bytes of zip archive with single member of the given name
+    """
+    archive = ZipStream()
+    for data in archive.write(name, chunks):
+        yield data
+    for data in archive.close():
+        yield data
+
+
+def iter_gzip(chunks, compresslevel=6):
+    """
+    Yields bytes of gzip compressed chunks
+    """
+    compressor = zlib.compressobj(compresslevel, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
@@ -0,0 +1,138 @@
+"""
+Minimal dependency free XLSX writer producing the file as a stream of bytes
+chunks, rows are compressed as they come so memory does not depend on the
+count of rows.
+"""
+import re
+from numbers import Number
+
+from django.utils import six
+from django.utils.encoding import force_text
+
+from .compression import ZipStream
+
+
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '<Override PartName="/xl/styles.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    '</Types>'
+)
+
+ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+
+WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="%s" sheetId="1" r:id="rId1"/></sheets>'
+    '</workbook>'
+)
+
+WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/>'
+    '<Relationship Id="rId2" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+    'Target="styles.xml"/>'
+    '</Relationships>'
+)
+
+STYLES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<fonts count="1"><font><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="1"><fill><patternFill patternType="none"/></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/></cellXfs>'
+    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+    '</styleSheet>'
+)
+
+SHEET_START = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+)
+
+SHEET_END = '</sheetData></worksheet>'
+
+# characters not allowed in XML 1.0 documents
+ILLEGAL_XML_CHARS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+ILLEGAL_SHEET_NAME_CHARS = re.compile(r'[\[\]:*?/\\]')
+
+
+def escape(value):
+    value = ILLEGAL_XML_CHARS.sub('', force_text(value))
+    return value.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;').replace('"', '&quot;')
+
+
+def column_name(index):
+    name = ''
+    index += 1
+    while index:
+        index, rest = divmod(index - 1, 26)
+        name = chr(ord('A') + rest) + name
+    return name
+
+
+def format_cell(ref, value):
+    if isinstance(value, Number) and not isinstance(value, bool):
+        return '<c r="%s"><v>%s</v></c>' % (ref, repr(value) if isinstance(value, float) else value)
+    if value is None:
+        value = ''
+    elif isinstance(value, six.binary_type):
+        value = value.decode('utf-8', 'replace')
+    return '<c r="%s" t="inlineStr"><is><t xml:space="preserve">%s</t></is></c>' % (ref, escape(value))
+
+
+def iter_sheet(rows):
+    yield SHEET_START.encode('utf-8')
+    for row_index, row in enumerate(rows, 1):
+        cells = ''.join(
+            format_cell('%s%d' % (column_name(col_index), row_index), value)
+            for col_index, value in enumerate(row)
+        )
+        yield ('<row r="%d">%s</row>' % (row_index, cells)).encode('utf-8')
+    yield SHEET_END.encode('utf-8')
+
+
+def iter_xlsx(rows, sheet_name='Sheet1'):
+    """
+    Yields bytes of XLSX workbook with single sheet filled with rows, numbers
+    are written as numeric cells and everything else as text
+    """
+    sheet_name = escape(ILLEGAL_SHEET_NAME_CHARS.sub('', force_text(sheet_name))[:31] or 'Sheet1')
+    archive = ZipStream()
+    parts = (
+        ('[Content_Types].xml', [CONTENT_TYPES.encode('utf-8')]),
+        ('_rels/.rels', [ROOT_RELS.encode('utf-8')]),
+        ('xl/workbook.xml', [(WORKBOOK % sheet_name).encode('utf-8')]),
+        ('xl/_rels/workbook.xml.rels', [WORKBOOK_RELS.encode('utf-8')]),
+        ('xl/styles.xml', [STYLES.encode('utf-8')]),
+        ('xl/worksheets/sheet1.xml', iter_sheet(rows)),
+    )
+    for name, chunks in parts:
+        for data in archive.write(name, chunks):
+            yield data
+    for data in archive.close():
+        yield data
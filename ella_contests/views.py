@@ -1,3 +1,4 @@
+from django.db import IntegrityError
 from django.http import Http404, HttpResponseRedirect
 from django.views.decorators.csrf import csrf_protect
 from django.utils.decorators import method_decorator
@@ -85,8 +86,8 @@ class ContestDetailFormView(ContestBaseFormView):
         if not self.contest.is_active:
             return self.form_invalid(form)
         response = super(ContestDetailFormView, self).form_valid(form)
-        storage.set_data(self.contest, self.question.pk, form.cleaned_data, response)
-        storage.set_last_step(self.contest, self.current_page, response)
+        storage.set_step_data(self.contest, self.question.pk, form.cleaned_data, self.current_page, response,
+                              request=self.request)
         return response
 
     def get_context_data(self, **kwargs):
@@ -157,15 +158,23 @@ class ContestContestantView(ContestBaseFormView):
     def form_invalid(self, form):
         response = super(ContestContestantView, self).form_invalid(form)
         if getattr(self, 'questions_data_invalid', False):
-            storage.remove_last_step(self.contest, response)
+            storage.remove_last_step(self.contest, response, request=self.request)
         return response
 
     def form_valid(self, form):
         if not self.contest.is_active:
             return self.form_invalid(form)
-        form.save()
+        try:
+            with transaction.atomic():
+                form.save()
+        except IntegrityError:
+            # concurrent submission with the same email won the race
+            if not form.is_email_used(form.cleaned_data['email']):
+                raise
+            form.add_email_used_error()
+            return self.form_invalid(form)
         response = super(ContestContestantView, self).form_valid(form)
-        storage.remove_all_data(self.contest, response)
+        storage.remove_all_data(self.contest, response, request=self.request)
         return response
 
     @method_decorator(csrf_protect)
@@ -0,0 +1,98 @@
+from __future__ import unicode_literals
+
+import shutil
+import tempfile
+from datetime import timedelta
+
+from mock import Mock, patch
+from nose import tools
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.test.utils import override_settings
+from django.utils.timezone import now
+
+from .test_exporters import ExportTestCase
+
+from ella_contests.models import Answer, Contestant, ExportArtifact
+from ella_contests.exporters import export_to_csv
+from ella_contests.artifacts import get_export_fingerprint, get_cached_export_response, cache_export_response
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class TestExportArtifacts(ExportTestCase):
+
+    def setUp(self):
+        super(TestExportArtifacts, self).setUp()
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root, CONTESTS_EXPORT_CACHE_SIZE=10 ** 6)
+        self.settings_override.enable()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root)
+        cache.clear()
+        super(TestExportArtifacts, self).tearDown()
+
+    def export(self):
+        fingerprint = get_export_fingerprint(self.contest, False, 'csv')
+        response = get_cached_export_response(fingerprint)
+        if response is None:
+            response = cache_export_response(export_to_csv(self.contest, False, 'export'), self.contest, fingerprint)
+        return b''.join(response.streaming_content)
+
+    def test_unchanged_contest_served_from_artifact(self):
+        content = self.export()
+        tools.assert_equals(ExportArtifact.objects.count(), 1)
+        with self.assertNumQueries(4):
+            tools.assert_equals(self.export(), content)
+
+    def test_fingerprint_changes_with_contest(self):
+        fingerprint = get_export_fingerprint(self.contest, False, 'csv')
+        tools.assert_equals(fingerprint, get_export_fingerprint(self.contest, False, 'csv'))
+        tools.assert_not_equals(fingerprint, get_export_fingerprint(self.contest, True, 'csv'))
+        tools.assert_not_equals(fingerprint, get_export_fingerprint(self.contest, False, 'xlsx'))
+
+        self.create_contestant('new@new.cz', [])
+        tools.assert_not_equals(fingerprint, get_export_fingerprint(self.contest, False, 'csv'))
+        fingerprint = get_export_fingerprint(self.contest, False, 'csv')
+
+        self.questions[0].save()
+        tools.assert_not_equals(fingerprint, get_export_fingerprint(self.contest, False, 'csv'))
+
+    @patch('ella_contests.artifacts.get_generation', Mock(return_value=1))
+    def test_fingerprint_changes_with_results(self):
+        # generation is fixed, so only changed results can change it
+        fingerprint = get_export_fingerprint(self.contest, True, 'csv')
+        self.contestant.winner = True
+        self.contestant.save()
+        tools.assert_not_equals(fingerprint, get_export_fingerprint(self.contest, True, 'csv'))
+
+        fingerprint = get_export_fingerprint(self.contest, True, 'csv')
+        self.choices[2].is_correct = False
+        self.choices[2].save()
+        tools.assert_not_equals(fingerprint, get_export_fingerprint(self.contest, True, 'csv'))
+
+        fingerprint = get_export_fingerprint(self.contest, True, 'csv')
+        contestant = Contestant.objects.get(pk=self.contestant.pk)
+        Answer.objects.filter(contestant=contestant).delete()
+        contestant.update_score()
+        tools.assert_not_equals(fingerprint, get_export_fingerprint(self.contest, True, 'csv'))
+
+    def test_interrupted_export_not_stored(self):
+        fingerprint = get_export_fingerprint(self.contest, False, 'csv')
+        response = cache_export_response(export_to_csv(self.contest, False, 'export'), self.contest, fingerprint)
+        next(iter(response.streaming_content))
+        response.close()
+        tools.assert_equals(ExportArtifact.objects.count(), 0)
+
+    def test_least_recently_used_artifacts_evicted(self):
+        for i in range(3):
+            ExportArtifact.objects.store(self.contest, 'fingerprint%d' % i, ContentFile(b'x' * 10), 'f.csv', 'text/csv')
+            ExportArtifact.objects.filter(fingerprint='fingerprint%d' % i).update(last_used=now() - timedelta(days=3 - i))
+        ExportArtifact.objects.get_fresh('fingerprint0')
+        ExportArtifact.objects.evict(20)
+        tools.assert_equals(
+            sorted(ExportArtifact.objects.values_list('fingerprint', flat=True)),
+            ['fingerprint0', 'fingerprint2']
+        )
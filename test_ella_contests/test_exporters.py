@@ -0,0 +1,263 @@
+from __future__ import unicode_literals
+
+import csv
+import gzip
+import io
+import os
+import shutil
+import tempfile
+import re
+import zipfile
+
+from mock import Mock, patch
+from nose import tools
+
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.utils import six
+from django.test.utils import override_settings
+from django.utils.encoding import force_text
+
+from .cases import ContestTestCase
+
+from ella_contests.models import Contest, Contestant, Answer
+from ella_contests.exporters import export_to_csv, export_to_xlsx, compress_response, ExportDataContainer
+
+
+class ExportTestCase(ContestTestCase):
+    def setUp(self):
+        super(ExportTestCase, self).setUp()
+        self.contestant = self.create_contestant('joe@joe.cz', [
+            (self.choices[2], ''),
+            (self.choices[5], 'hi'),
+            (self.choices[8], ''),
+        ])
+        self.contestant2 = self.create_contestant('mike@mike.cz', [
+            (self.choices[1], ''),
+            (self.choices[6], ''),
+        ])
+
+    def create_contestant(self, email, answers):
+        contestant = Contestant.objects.create(
+            contest=self.contest,
+            name='Joe',
+            surname='Good',
+            email=email,
+            phone_number='777777777',
+            address='XX street 123'
+        )
+        for choice, text in answers:
+            Answer.objects.create(contestant=contestant, choice=choice, answer=text)
+        contestant.update_score()
+        return contestant
+
+    def read_csv(self, response):
+        content = b''.join(response.streaming_content)
+        if six.PY2:
+            return [[force_text(i) for i in row] for row in csv.reader(content.splitlines())]
+        return list(csv.reader(force_text(content).splitlines()))
+
+
+class TestExportToCsv(ExportTestCase):
+
+    def test_export_all(self):
+        response = export_to_csv(self.contest, False, 'export')
+        tools.assert_equals(response['Content-Disposition'], 'attachment; filename=export.csv')
+        rows = self.read_csv(response)
+        tools.assert_equals(len(rows), 3)
+        tools.assert_equals(rows[0][-3:], ['q 1 (3)', 'q 2 (3)', 'q 3 (3)'])
+        rows = dict((r[2], r) for r in rows[1:])
+        tools.assert_equals(rows['joe@joe.cz'][6:], ['2', '2', '3', 'hi', '3'])
+        tools.assert_equals(rows['mike@mike.cz'][6:], ['0', '2', '2', '', '1'])
+
+    def test_export_all_correct(self):
+        rows = self.read_csv(export_to_csv(self.contest, True, 'export'))
+        tools.assert_equals(len(rows), 2)
+        tools.assert_equals(rows[1][2], 'joe@joe.cz')
+
+
+class InProcessPool(object):
+    """
+    Runs tasks of multiprocessing.Pool right away in the test process.
+    """
+
+    def __init__(self, processes, initializer=None):
+        pass
+
+    def apply_async(self, func, args):
+        return Mock(get=Mock(return_value=func(*args)))
+
+    def terminate(self):
+        pass
+
+    def join(self):
+        pass
+
+
+class TestExportToCsvParallel(ExportTestCase):
+
+    @override_settings(CONTESTS_EXPORT_CHUNK_SIZE=1)
+    def test_same_rows_as_single_process_export(self):
+        with patch('multiprocessing.Pool', InProcessPool):
+            rows = self.read_csv(export_to_csv(self.contest, False, 'export', workers=2))
+        tools.assert_equals(rows, self.read_csv(export_to_csv(self.contest, False, 'export')))
+        tools.assert_equals(len(rows), 3)
+
+    def test_no_contestants(self):
+        with patch('multiprocessing.Pool', InProcessPool):
+            rows = self.read_csv(export_to_csv(self.contest, False, 'export', workers=2, since=self.contestant2.pk))
+        tools.assert_equals(len(rows), 1)
+
+    def test_local_data_container_class_is_refused(self):
+        class LocalDataContainer(ExportDataContainer):
+            pass
+
+        tools.assert_raises(ValueError, export_to_csv, self.contest, False, 'export',
+                            data_container_class=LocalDataContainer, workers=2)
+
+
+class TestExportToXlsx(ExportTestCase):
+
+    def test_export_all(self):
+        response = export_to_xlsx(self.contest, False, 'export')
+        tools.assert_equals(response['Content-Disposition'], 'attachment; filename=export.xlsx')
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+        tools.assert_equals(archive.testzip(), None)
+        sheet = archive.read('xl/worksheets/sheet1.xml').decode('utf-8')
+        tools.assert_equals(len(re.findall('<row ', sheet)), 3)
+        tools.assert_in('<c r="J2" t="inlineStr"><is><t xml:space="preserve">hi</t></is></c>', sheet)
+        tools.assert_in('<c r="G2"><v>2</v></c><c r="H2"><v>2</v></c>', sheet)
+        tools.assert_in('<c r="K2"><v>3</v></c>', sheet)
+
+    def test_export_all_correct(self):
+        response = export_to_xlsx(self.contest, True, 'export')
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+        sheet = archive.read('xl/worksheets/sheet1.xml').decode('utf-8')
+        tools.assert_equals(len(re.findall('<row ', sheet)), 2)
+
+
+class TestCompressResponse(ExportTestCase):
+
+    def test_gzip(self):
+        content = b''.join(export_to_csv(self.contest, False, 'export').streaming_content)
+        response = compress_response(export_to_csv(self.contest, False, 'export'), 'gzip')
+        tools.assert_equals(response['Content-Type'], 'application/gzip')
+        tools.assert_equals(response['Content-Disposition'], 'attachment; filename=export.csv.gz')
+        compressed = b''.join(response.streaming_content)
+        tools.assert_equals(gzip.GzipFile(fileobj=io.BytesIO(compressed)).read(), content)
+
+    def test_zip(self):
+        content = b''.join(export_to_csv(self.contest, False, 'export').streaming_content)
+        response = compress_response(export_to_csv(self.contest, False, 'export'), 'zip')
+        tools.assert_equals(response['Content-Disposition'], 'attachment; filename=export.csv.zip')
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+        tools.assert_equals(archive.namelist(), ['export.csv'])
+        tools.assert_equals(archive.read('export.csv'), content)
+
+    def test_not_streaming_response(self):
+        response = HttpResponse(b'<table></table>')
+        response['Content-Disposition'] = 'attachment; filename=export.xls'
+        response = compress_response(response, 'zip')
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+        tools.assert_equals(archive.read('export.xls'), b'<table></table>')
+
+
+class TestExportDataContainer(ExportTestCase):
+
+    @override_settings(CONTESTS_EXPORT_CHUNK_SIZE=1)
+    def test_rows_query_count_independent_of_contestants(self):
+        container = ExportDataContainer(Contest.objects.get(pk=self.contest.pk))
+        container.all_choices
+        # one query for contestants and one for answers of every chunk and
+        # the last query finding out there are no more contestants
+        with self.assertNumQueries(5):
+            rows = [list(r) for r in container.get_rows_data()]
+        tools.assert_equals(len(rows), 2)
+
+    def test_rows_ordered_by_contestant_pk(self):
+        container = ExportDataContainer(self.contest)
+        tools.assert_equals([list(r)[2] for r in container.get_rows_data()], ['joe@joe.cz', 'mike@mike.cz'])
+
+    def test_head_reports_all_questions_without_correct_choice(self):
+        self.choices[2].is_correct = False
+        self.choices[2].save()
+        self.choices[7].is_correct = True
+        self.choices[7].save()
+        container = ExportDataContainer(Contest.objects.get(pk=self.contest.pk))
+        try:
+            container.get_head_data()
+        except ExportDataContainer.IncorrectHeadData as e:
+            tools.assert_equals([q.order for q in e.questions], [1, 3])
+        else:
+            raise AssertionError('IncorrectHeadData not raised')
+
+    def test_head_without_queries(self):
+        container = ExportDataContainer(Contest.objects.get(pk=self.contest.pk))
+        container.contest.snapshot
+        with self.assertNumQueries(0):
+            head = list(container.get_head_data())
+        tools.assert_equals(head[-3:], ['q 1 (3)', 'q 2 (3)', 'q 3 (3)'])
+
+    def test_rows_after_pk_checkpoint(self):
+        container = ExportDataContainer(self.contest, since=self.contestant.pk)
+        tools.assert_equals([list(r)[2] for r in container.get_rows_data()], ['mike@mike.cz'])
+        tools.assert_equals(container.last_pk, self.contestant2.pk)
+
+    def test_rows_after_created_checkpoint(self):
+        container = ExportDataContainer(self.contest, since=self.contestant2.created)
+        tools.assert_equals(list(container.get_rows_data()), [])
+        tools.assert_equals(container.last_pk, None)
+
+    @override_settings(CONTESTS_EXPORT_CHUNK_SIZE=1)
+    def test_pk_ranges(self):
+        container = ExportDataContainer(self.contest)
+        tools.assert_equals(container.get_pk_ranges(), [
+            (None, self.contestant.pk),
+            (self.contestant.pk, self.contestant2.pk),
+        ])
+
+    def test_pk_range_of_last_chunk(self):
+        container = ExportDataContainer(self.contest)
+        tools.assert_equals(container.get_pk_ranges(), [(None, self.contestant2.pk)])
+        rows = container.get_rows_data((self.contestant.pk, self.contestant2.pk))
+        tools.assert_equals([list(r)[2] for r in rows], ['mike@mike.cz'])
+
+    def test_filters(self):
+        Contestant.objects.filter(pk=self.contestant2.pk).update(winner=True)
+        tools.assert_equals(list(ExportDataContainer(self.contest, winners_only=True).get_contestants()),
+                            [self.contestant2])
+        tools.assert_equals(list(ExportDataContainer(self.contest, min_score=1).get_contestants()),
+                            [self.contestant])
+        container = ExportDataContainer(self.contest, created_from=self.contestant2.created)
+        tools.assert_equals(list(container.get_contestants()), [self.contestant2])
+        container = ExportDataContainer(self.contest, created_till=self.contestant.created)
+        tools.assert_equals(list(container.get_contestants()), [self.contestant])
+
+    def test_column_subset(self):
+        container = ExportDataContainer(Contest.objects.get(pk=self.contest.pk), columns=['email', 'score'])
+        tools.assert_equals(list(container.get_head_data()), ['email', 'Count of right answers'])
+        # answers are not read at all
+        with self.assertNumQueries(1):
+            rows = [list(r) for r in container.get_rows_data()]
+        tools.assert_equals(rows, [['joe@joe.cz', 2], ['mike@mike.cz', 0]])
+
+    def test_unknown_column(self):
+        tools.assert_raises(ValueError, ExportDataContainer, self.contest, columns=['password'])
+
+
+class TestExportCommand(ExportTestCase):
+
+    def setUp(self):
+        super(TestExportCommand, self).setUp()
+        self.directory = tempfile.mkdtemp()
+        self.output = os.path.join(self.directory, 'export.csv')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+        super(TestExportCommand, self).tearDown()
+
+    def test_export_to_file(self):
+        call_command('export_contest_results', str(self.contest.pk), self.output, min_score=1, columns='email,answers')
+        with open(self.output, 'rb') as f:
+            rows = list(csv.reader(force_text(f.read()).splitlines()))
+        tools.assert_equals(rows, [['email', 'q 1 (3)', 'q 2 (3)', 'q 3 (3)'], ['joe@joe.cz', '3', 'hi', '3']])
@@ -1,13 +1,18 @@
 from __future__ import unicode_literals
 
 from nose import tools
+from mock import Mock
 
 from django.forms.models import inlineformset_factory
+from django.http import HttpResponse
+from django.test.client import RequestFactory
+from django.contrib.auth.models import AnonymousUser
 
 from .cases import ContestTestCase, create_question, create_choice
 
-from ella_contests.models import Choice, Question
-from ella_contests.forms import ChoiceForm, ChoiceInlineFormset
+from ella_contests.models import Choice, Question, Answer, Contestant, ContestStats
+from ella_contests.forms import ChoiceForm, ChoiceInlineFormset, ContestantForm
+from ella_contests.storages import storage
 
 
 class TestChiceForms(ContestTestCase):
@@ -310,3 +315,98 @@ class TestChiceFormSet(ContestTestCase):
         tools.assert_in('You must specify one correct choice per question', f.non_form_errors())
         tools.assert_equals(Choice.objects.filter(question=question).count(), 3)
         tools.assert_equals(Choice.objects.filter(question=question, is_correct=True).count(), 1)
+
+
+class TestContestantForm(ContestTestCase):
+    def setUp(self):
+        super(TestContestantForm, self).setUp()
+        self.data = {
+            'name': 'Joe',
+            'surname': 'Good',
+            'email': 'joe@joe.cz',
+            'address': 'XX street 123',
+        }
+
+    def get_form(self, choices, data=None):
+        request = RequestFactory().post('/')
+        request.user = AnonymousUser()
+        response = HttpResponse()
+        for question, choice in zip(self.questions, choices):
+            storage.set_data(self.contest, question.pk, {'choice': choice}, response)
+        for name, morsel in response.cookies.items():
+            request.COOKIES[name] = morsel.value
+        view = Mock(contest=self.contest, request=request)
+        return ContestantForm(view, data or self.data)
+
+    def test_save_all_correct_answers(self):
+        form = self.get_form([
+            str(self.choices[2].pk),
+            [str(self.choices[5].pk), ' hi '],
+            str(self.choices[8].pk),
+        ])
+        tools.assert_true(form.is_valid())
+        contestant = form.save()
+        tools.assert_equals(contestant.score, 2)
+        tools.assert_equals(contestant.all_correct, True)
+        tools.assert_equals(
+            sorted(Answer.objects.filter(contestant=contestant).values_list('choice_id', 'answer')),
+            [(self.choices[2].pk, ''), (self.choices[5].pk, 'hi'), (self.choices[8].pk, '')]
+        )
+        stats = ContestStats.objects.get(contest=self.contest)
+        tools.assert_equals(stats.contestants_count, 1)
+        tools.assert_equals(stats.all_correct_answers_count, 1)
+
+    def test_save_empty_text_answer_is_not_correct(self):
+        form = self.get_form([
+            str(self.choices[2].pk),
+            [str(self.choices[5].pk), ''],
+            str(self.choices[7].pk),
+        ])
+        tools.assert_true(form.is_valid())
+        contestant = form.save()
+        tools.assert_equals(contestant.score, 1)
+        tools.assert_equals(contestant.all_correct, False)
+        tools.assert_equals(Answer.objects.filter(contestant=contestant).count(), 3)
+
+    def test_scored_against_current_choices(self):
+        # cached snapshot of the contest does not know about the change
+        self.contest.snapshot
+        Choice.objects.filter(pk=self.choices[2].pk).update(is_correct=False)
+        Choice.objects.filter(pk=self.choices[1].pk).update(is_correct=True)
+        form = self.get_form([
+            str(self.choices[1].pk),
+            [str(self.choices[5].pk), 'hi'],
+            str(self.choices[8].pk),
+        ])
+        tools.assert_true(form.is_valid())
+        contestant = form.save()
+        tools.assert_equals(contestant.score, 2)
+        tools.assert_equals(contestant.all_correct, True)
+
+    def test_invalid_if_choice_deleted(self):
+        self.contest.snapshot
+        Choice.objects.filter(pk=self.choices[0].pk).delete()
+        form = self.get_form([
+            str(self.choices[0].pk),
+            [str(self.choices[5].pk), 'hi'],
+            str(self.choices[8].pk),
+        ])
+        tools.assert_false(form.is_valid())
+        tools.assert_true(form.view_instance.questions_data_invalid)
+
+    def test_invalid_if_questions_missing(self):
+        form = self.get_form([str(self.choices[2].pk)])
+        tools.assert_false(form.is_valid())
+        tools.assert_in('__all__', form.errors)
+
+    def test_invalid_if_email_used_in_other_case(self):
+        Contestant.objects.create(contest=self.contest, name='Joe', surname='Good',
+                                  email='joe@joe.cz', address='XX street 123')
+        data = dict(self.data, email='Joe@JOE.cz')
+        form = self.get_form([
+            str(self.choices[2].pk),
+            [str(self.choices[5].pk), 'hi'],
+            str(self.choices[8].pk),
+        ], data)
+        tools.assert_false(form.is_valid())
+        tools.assert_in(ContestantForm.error_messages['email_used'], form.errors['__all__'])
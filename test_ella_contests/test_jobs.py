@@ -0,0 +1,198 @@
+from __future__ import unicode_literals
+
+import gzip
+import shutil
+import tempfile
+from datetime import timedelta
+
+from mock import Mock, patch
+from nose import tools
+
+from django.contrib import admin
+from django.core.cache import cache
+from django.test import RequestFactory
+from django.test.utils import override_settings
+
+from ella.utils.timezone import now
+
+from .test_exporters import ExportTestCase, InProcessPool
+
+from ella_contests.admin import ContestAdmin
+from ella_contests.artifacts import get_export_fingerprint, get_cached_export_response
+from ella_contests.conf import contests_settings
+from ella_contests.models import Contest, ExportJob, ExportArtifact
+from ella_contests.exporters import ExportDataContainer, export_to_csv
+from ella_contests.jobs import run_pending_jobs
+
+
+# fingerprints of exports depend on cached contest generation
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class TestExportJobs(ExportTestCase):
+    export_types = {'csv': ('csv', export_to_csv)}
+
+    def setUp(self):
+        super(TestExportJobs, self).setUp()
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root)
+        cache.clear()
+        super(TestExportJobs, self).tearDown()
+
+    def run_jobs(self):
+        return run_pending_jobs(self.export_types, ExportDataContainer)
+
+    def test_pending_job_is_exported_to_file(self):
+        job = ExportJob.objects.create(contest=self.contest, export_type='csv')
+        tools.assert_equals(self.run_jobs(), 1)
+        job = ExportJob.objects.get(pk=job.pk)
+        tools.assert_equals(job.status, ExportJob.STATUS_DONE)
+        tools.assert_equals((job.rows_done, job.rows_total, job.progress), (2, 2, 100))
+        tools.assert_true(job.file_name.endswith('.csv'))
+        tools.assert_equals(job.content_type, 'text/csv')
+        content = job.file.storage.open(job.file.name, 'rb').read()
+        tools.assert_equals(len(content.splitlines()), 3)
+
+    @override_settings(CONTESTS_EXPORT_CHUNK_SIZE=1)
+    def test_job_exported_by_workers(self):
+        job = ExportJob.objects.create(contest=self.contest, export_type='csv')
+        with patch('multiprocessing.Pool', InProcessPool):
+            tools.assert_equals(run_pending_jobs(self.export_types, ExportDataContainer, workers=2), 1)
+        job = ExportJob.objects.get(pk=job.pk)
+        tools.assert_equals(job.status, ExportJob.STATUS_DONE)
+        tools.assert_equals((job.rows_done, job.rows_total, job.last_pk), (2, 2, self.contestant2.pk))
+        content = job.file.storage.open(job.file.name, 'rb').read()
+        tools.assert_equals(len(content.splitlines()), 3)
+
+    def test_only_pending_jobs_are_run(self):
+        ExportJob.objects.create(contest=self.contest, export_type='csv', status=ExportJob.STATUS_RUNNING)
+        tools.assert_equals(self.run_jobs(), 0)
+
+    def test_claimed_job_is_not_claimed_again(self):
+        job = ExportJob.objects.create(contest=self.contest, export_type='csv')
+        tools.assert_true(ExportJob.objects.claim(job))
+        tools.assert_false(ExportJob.objects.claim(ExportJob.objects.get(pk=job.pk)))
+
+    def test_job_fails_for_incorrect_data(self):
+        self.choices[2].is_correct = False
+        self.choices[2].save()
+        job = ExportJob.objects.create(contest=self.contest, export_type='csv')
+        self.run_jobs()
+        job = ExportJob.objects.get(pk=job.pk)
+        tools.assert_equals(job.status, ExportJob.STATUS_FAILED)
+        tools.assert_in('1', job.error)
+        tools.assert_false(job.file)
+
+    def test_job_fails_for_unknown_type(self):
+        job = ExportJob.objects.create(contest=self.contest, export_type='pdf')
+        self.run_jobs()
+        tools.assert_equals(ExportJob.objects.get(pk=job.pk).status, ExportJob.STATUS_FAILED)
+
+    def test_delta_job_exports_rows_after_checkpoint(self):
+        ExportJob.objects.create(contest=self.contest, export_type='csv')
+        self.run_jobs()
+        tools.assert_equals(ExportJob.objects.get_checkpoint(self.contest), self.contestant2.pk)
+
+        contestant = self.create_contestant('new@new.cz', [(self.choices[2], '')])
+        job = ExportJob.objects.create(contest=self.contest, export_type='csv',
+                                       since_pk=ExportJob.objects.get_checkpoint(self.contest))
+        self.run_jobs()
+        job = ExportJob.objects.get(pk=job.pk)
+        tools.assert_equals((job.rows_done, job.last_pk), (1, contestant.pk))
+        content = job.file.storage.open(job.file.name, 'rb').read()
+        tools.assert_equals(len(content.splitlines()), 2)
+        tools.assert_equals(ExportJob.objects.get_checkpoint(self.contest), contestant.pk)
+
+    def test_checkpoint_kept_by_empty_delta_job(self):
+        job = ExportJob.objects.create(contest=self.contest, export_type='csv', since_pk=self.contestant2.pk)
+        self.run_jobs()
+        job = ExportJob.objects.get(pk=job.pk)
+        tools.assert_equals((job.rows_done, job.last_pk), (0, self.contestant2.pk))
+        tools.assert_equals(ExportJob.objects.get_checkpoint(self.contest, all_correct=True), None)
+
+    def test_abandoned_running_job_is_failed(self):
+        started = now() - timedelta(seconds=contests_settings.EXPORT_JOB_TIMEOUT + 1)
+        abandoned = ExportJob.objects.create(contest=self.contest, export_type='csv',
+                                             status=ExportJob.STATUS_RUNNING, started=started)
+        running = ExportJob.objects.create(contest=self.contest, export_type='csv',
+                                           status=ExportJob.STATUS_RUNNING, started=now())
+        self.run_jobs()
+        tools.assert_equals(ExportJob.objects.get(pk=abandoned.pk).status, ExportJob.STATUS_FAILED)
+        tools.assert_equals(ExportJob.objects.get(pk=running.pk).status, ExportJob.STATUS_RUNNING)
+
+    def test_latest_jobs(self):
+        done = ExportJob.objects.create(contest=self.contest, export_type='csv')
+        self.run_jobs()
+        failed = ExportJob.objects.create(contest=self.contest, export_type='csv', status=ExportJob.STATUS_FAILED)
+        ExportJob.objects.create(contest=self.contest, export_type='xlsx', status=ExportJob.STATUS_FAILED)
+        xlsx = ExportJob.objects.create(contest=self.contest, export_type='xlsx', status=ExportJob.STATUS_FAILED)
+        tools.assert_equals(
+            sorted(ExportJob.objects.latest().values_list('pk', flat=True)),
+            # done one holds the checkpoint
+            [done.pk, failed.pk, xlsx.pk]
+        )
+
+    def test_expired_jobs_deleted_with_files(self):
+        jobs = []
+        for i in range(3):
+            jobs.append(ExportJob.objects.create(contest=self.contest, export_type='csv'))
+            self.run_jobs()
+        jobs = [ExportJob.objects.get(pk=job.pk) for job in jobs]
+        expired = now() - timedelta(seconds=contests_settings.EXPORT_JOB_RETENTION + 1)
+        ExportJob.objects.filter(pk__in=[job.pk for job in jobs]).update(finished=expired)
+
+        self.run_jobs()
+        # the newest one is kept as it is the latest export and checkpoint
+        tools.assert_equals(list(ExportJob.objects.values_list('pk', flat=True)), [jobs[2].pk])
+        tools.assert_false(jobs[0].file.storage.exists(jobs[0].file.name))
+        tools.assert_true(jobs[2].file.storage.exists(jobs[2].file.name))
+
+    def request_export(self, **params):
+        params.setdefault('type', 'csv')
+        model_admin = ContestAdmin(Contest, admin.site)
+        model_admin.message_user = Mock()
+        model_admin.request_export_response(RequestFactory().get('/', params), self.contest)
+
+    def test_compressed_job(self):
+        self.request_export(compression='gzip')
+        self.run_jobs()
+        job = ExportJob.objects.get()
+        tools.assert_equals((job.status, job.compression), (ExportJob.STATUS_DONE, 'gzip'))
+        tools.assert_true(job.file_name.endswith('.csv.gz'))
+        tools.assert_equals(job.content_type, 'application/gzip')
+        content = gzip.GzipFile(fileobj=job.file.storage.open(job.file.name, 'rb')).read()
+        tools.assert_equals(len(content.splitlines()), 3)
+
+        # uncompressed file is another export
+        self.request_export()
+        tools.assert_equals(ExportJob.objects.filter(status=ExportJob.STATUS_PENDING, compression='').count(), 1)
+
+    def test_unknown_compression_not_requested(self):
+        self.request_export(compression='rar')
+        tools.assert_equals(ExportJob.objects.count(), 0)
+
+    def test_unchanged_export_not_requested_again(self):
+        self.request_export()
+        self.run_jobs()
+        job = ExportJob.objects.get()
+        tools.assert_equals(job.fingerprint, get_export_fingerprint(self.contest, False, 'csv'))
+
+        self.request_export()
+        tools.assert_equals(ExportJob.objects.count(), 1)
+
+        self.create_contestant('new@new.cz', [(self.choices[2], '')])
+        self.request_export()
+        tools.assert_equals(ExportJob.objects.filter(status=ExportJob.STATUS_PENDING).count(), 1)
+
+    def test_job_file_stored_as_artifact(self):
+        with override_settings(CONTESTS_EXPORT_CACHE_SIZE=10 ** 6):
+            self.request_export()
+            self.run_jobs()
+            job = ExportJob.objects.get()
+            artifact = ExportArtifact.objects.get(fingerprint=job.fingerprint)
+            response = get_cached_export_response(job.fingerprint)
+        tools.assert_equals(artifact.file_name, job.file_name)
+        tools.assert_equals(b''.join(response.streaming_content), job.file.storage.open(job.file.name, 'rb').read())
@@ -5,10 +5,16 @@ from nose import tools
 from mock import patch
 
 from django.db import IntegrityError
+from django.test import TestCase
+from django.test.utils import override_settings
+from django.core.cache import cache
 
 from .cases import ContestTestCase
 
-from ella_contests.models import Question, Contestant, Answer
+from ella_contests.models import Question, Contest, Contestant, Answer, ContestStats
+from ella_contests.conf import contests_settings
+from ella_contests.snapshot import ContestSnapshot
+from ella_contests.utils.cache import get_generation, get_contest_key, local_cache, LocalCache
 
 
 class MockedDatetime(datetime):
@@ -28,6 +34,14 @@ class TestContest(ContestTestCase):
         tools.assert_equals(self.contest.questions[1], self.questions[1])
         tools.assert_equals(self.contest.questions[2], self.questions[2])
 
+    def test_snapshot_loads_questions_and_choices_at_once(self):
+        contest = Contest.objects.get(pk=self.contest.pk)
+        with self.assertNumQueries(2):
+            choices = [q.choices for q in contest.questions]
+        tools.assert_equals(contest.questions, self.questions)
+        tools.assert_equals(choices, [self.choices[:3], self.choices[3:6], self.choices[6:]])
+        tools.assert_equals(contest[1], self.questions[1])
+
     @patch('django.utils.timezone.datetime')
     def test_contest_time_states(self, mock_datetime):
         mock_datetime.now = lambda: datetime.now()
@@ -53,6 +67,141 @@ class TestContest(ContestTestCase):
         tools.assert_equals(list(self.contest.right_choices), [self.choices[2], self.choices[5]])
 
 
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class TestContestCache(ContestTestCase):
+    def setUp(self):
+        super(TestContestCache, self).setUp()
+        self.generation = get_generation(self.contest.pk)
+
+    def test_generation_bumped_on_question_change(self):
+        self.questions[0].save()
+        tools.assert_true(get_generation(self.contest.pk) > self.generation)
+
+    def test_generation_bumped_on_choice_change(self):
+        self.choices[0].save()
+        tools.assert_true(get_generation(self.contest.pk) > self.generation)
+
+    def test_generation_of_other_contest_untouched(self):
+        generation = get_generation(self.contest_question_less.pk)
+        self.choices[0].save()
+        tools.assert_equals(get_generation(self.contest_question_less.pk), generation)
+
+    def test_snapshot_rolls_over_with_generation(self):
+        Contest.objects.get(pk=self.contest.pk).snapshot
+        self.choices[0].choice = 'changed'
+        self.choices[0].save()
+        contest = Contest.objects.get(pk=self.contest.pk)
+        tools.assert_equals(contest.questions[0].choices[0].choice, 'changed')
+
+    def test_stale_snapshot_served_while_other_worker_computes(self):
+        Contest.objects.get(pk=self.contest.pk).snapshot
+        self.choices[0].choice = 'changed'
+        self.choices[0].save()
+        key = get_contest_key(contests_settings.SNAPSHOT_CACHE_KEY_PATTERN, self.contest.pk,
+                              ContestSnapshot.FORMAT_VERSION)
+        cache.add('%s:lock' % key, 1)
+        contest = Contest.objects.get(pk=self.contest.pk)
+        tools.assert_equals(contest.questions[0].choices[0].choice, 'choice 1:1?')
+
+
+@override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+    CONTESTS_LOCAL_CACHE_SIZE=10
+)
+class TestContestLocalCache(ContestTestCase):
+    def setUp(self):
+        super(TestContestLocalCache, self).setUp()
+        self.addCleanup(local_cache.clear)
+
+    def test_snapshot_served_from_local_cache(self):
+        snapshot = Contest.objects.get(pk=self.contest.pk).snapshot
+        contest = Contest.objects.get(pk=self.contest.pk)
+        with self.assertNumQueries(0):
+            tools.assert_true(contest.snapshot is snapshot)
+
+    def test_local_snapshot_invalidated_by_generation(self):
+        snapshot = Contest.objects.get(pk=self.contest.pk).snapshot
+        self.choices[0].save()
+        tools.assert_false(Contest.objects.get(pk=self.contest.pk).snapshot is snapshot)
+
+    def test_stale_snapshot_not_kept_locally(self):
+        Contest.objects.get(pk=self.contest.pk).snapshot
+        self.choices[0].choice = 'changed'
+        self.choices[0].save()
+        key = get_contest_key(contests_settings.SNAPSHOT_CACHE_KEY_PATTERN, self.contest.pk,
+                              ContestSnapshot.FORMAT_VERSION)
+        cache.add('%s:lock' % key, 1)
+        contest = Contest.objects.get(pk=self.contest.pk)
+        tools.assert_equals(contest.questions[0].choices[0].choice, 'choice 1:1?')
+
+        cache.delete('%s:lock' % key)
+        contest = Contest.objects.get(pk=self.contest.pk)
+        tools.assert_equals(contest.questions[0].choices[0].choice, 'changed')
+
+
+class TestContestSnapshot(ContestTestCase):
+    def setUp(self):
+        super(TestContestSnapshot, self).setUp()
+        self.snapshot = Contest.objects.get(pk=self.contest.pk).snapshot
+
+    def test_snapshot_survives_serialization(self):
+        snapshot = ContestSnapshot.loads(self.snapshot.dumps())
+        tools.assert_equals(snapshot.questions, self.snapshot.questions)
+        tools.assert_equals(snapshot.choices, self.snapshot.choices)
+
+    def test_snapshot_data_are_immutable(self):
+        tools.assert_raises(AttributeError, setattr, self.snapshot[0], 'text', 'changed')
+
+    def test_questions_built_from_snapshot(self):
+        question = Contest.objects.get(pk=self.contest.pk)[1]
+        tools.assert_equals(question, self.questions[1])
+        tools.assert_equals(question.text, self.questions[1].text)
+        tools.assert_equals(question.choices[2].inserted_by_user, True)
+
+    def test_refresh_snapshot_reads_database_once(self):
+        contest = Contest.objects.get(pk=self.contest.pk)
+        contest.questions
+        with self.assertNumQueries(1):
+            snapshot = contest.refresh_snapshot()
+        tools.assert_equals(snapshot.questions, self.snapshot.questions)
+        tools.assert_equals(snapshot.choices, self.snapshot.choices)
+        tools.assert_true(contest.snapshot is snapshot)
+
+    def test_refresh_snapshot_of_contest_without_questions(self):
+        contest = Contest.objects.get(pk=self.contest_question_less.pk)
+        tools.assert_equals(len(contest.refresh_snapshot()), 0)
+
+
+class TestLocalCache(TestCase):
+    def setUp(self):
+        self.cache = LocalCache(2, 60)
+
+    def test_value_returned_only_for_same_version(self):
+        self.cache.set('a', 1, 'value')
+        tools.assert_equals(self.cache.get('a', 1), 'value')
+        tools.assert_equals(self.cache.get('a', 2), None)
+
+    def test_least_recently_used_value_evicted(self):
+        self.cache.set('a', 1, 'a')
+        self.cache.set('b', 1, 'b')
+        self.cache.get('a', 1)
+        self.cache.set('c', 1, 'c')
+        tools.assert_equals(self.cache.get('a', 1), 'a')
+        tools.assert_equals(self.cache.get('b', 1), None)
+        tools.assert_equals(self.cache.get('c', 1), 'c')
+
+    def test_settings_read_when_used(self):
+        cache = LocalCache()
+        with override_settings(CONTESTS_LOCAL_CACHE_SIZE=1, CONTESTS_LOCAL_CACHE_TIMEOUT=-1):
+            tools.assert_equals((cache.max_size, cache.timeout), (1, -1))
+            cache.set('a', 1, 'a')
+            tools.assert_equals(cache.get('a', 1), None)
+        with override_settings(CONTESTS_LOCAL_CACHE_SIZE=1):
+            cache.set('a', 1, 'a')
+            cache.set('b', 1, 'b')
+            tools.assert_equals((cache.get('a', 1), cache.get('b', 1)), (None, 'b'))
+
+
 class TestQuestion(ContestTestCase):
     def setUp(self):
         super(TestQuestion, self).setUp()
@@ -82,6 +231,14 @@ class TestQuestion(ContestTestCase):
         tools.assert_equals(self.questions[1].position, 2)
         tools.assert_equals(self.questions[2].position, 3)
 
+    def test_navigation_without_queries(self):
+        contest = Contest.objects.get(pk=self.contest.pk)
+        questions = contest.questions
+        with self.assertNumQueries(0):
+            tools.assert_equals([q.position for q in questions], [1, 2, 3])
+            tools.assert_equals(questions[1].prev, questions[0])
+            tools.assert_equals(questions[1].next, questions[2])
+
     def test_save_method_unique_order_question_per_contest(self):
         self.question.order = 2
         tools.assert_raises(IntegrityError, self.question.save)
@@ -126,6 +283,8 @@ class TestContestant(ContestTestCase):
             Answer.objects.create(contestant=self.contestant2, choice=self.choices[6]),
             Answer.objects.create(contestant=self.contestant2, choice=self.choices[7]),
         ]
+        self.contestant.update_score()
+        self.contestant2.update_score()
 
     def test_contest_right_answers(self):
         tools.assert_equals(self.contest.right_answers.count(), 2)
@@ -139,7 +298,28 @@ class TestContestant(ContestTestCase):
         tools.assert_equals(self.contest.get_contestants_with_correct_answer().count(), 1)
         self.answers[3].choice = self.choices[2]
         self.answers[3].save()
+        self.contestant2.update_score()
         tools.assert_equals(self.contest.get_contestants_with_correct_answer().count(), 2)
+        tools.assert_equals(list(self.contest.get_contestants_with_correct_answer()),
+                            [self.contestant, self.contestant2])
+        tools.assert_equals([c.answers_count for c in self.contest.get_contestants_with_correct_answer()], [2, 1])
+
+    def test_contestants_with_all_correct_answers(self):
+        tools.assert_equals(list(self.contest.get_contestants_with_all_correct_answers()), [self.contestant])
+
+    def test_contestant_score(self):
+        tools.assert_equals(self.contestant.score, 2)
+        tools.assert_equals(self.contestant.all_correct, True)
+        tools.assert_equals(self.contestant2.score, 0)
+        tools.assert_equals(self.contestant2.all_correct, False)
+        tools.assert_equals(Contestant.objects.get(pk=self.contestant.pk).score, 2)
+
+    def test_contestant_score_ignores_empty_text_answer(self):
+        self.answers[1].answer = ""
+        self.answers[1].save()
+        self.contestant.update_score()
+        tools.assert_equals(self.contestant.score, 1)
+        tools.assert_equals(self.contestant.all_correct, False)
 
     def test_contestant_right_answers(self):
         tools.assert_equals(self.contestant.my_right_answers.count(), 2)
@@ -149,6 +329,83 @@ class TestContestant(ContestTestCase):
         tools.assert_equals(self.contestant.get_my_text_answers().count(), 1)
         tools.assert_equals(self.contestant2.get_my_text_answers().count(), 0)
 
+    def test_save_method_normalizes_email(self):
+        self.contestant.email = ' Joe@Joe.CZ '
+        self.contestant.save()
+        tools.assert_equals(Contestant.objects.get(pk=self.contestant.pk).email, 'joe@joe.cz')
+
     def test_save_method_unique_email_per_contest(self):
         self.contestant2.email = self.contestant.email
         tools.assert_raises(IntegrityError, self.contestant2.save)
+
+    def test_contestants_rescored_when_answer_key_changes(self):
+        ContestStats.objects.rebuild(self.contest)
+        self.choices[2].is_correct = False
+        self.choices[2].save()
+        self.choices[1].is_correct = True
+        self.choices[1].save()
+        contestant = Contestant.objects.get(pk=self.contestant.pk)
+        tools.assert_equals((contestant.score, contestant.all_correct), (1, False))
+        contestant2 = Contestant.objects.get(pk=self.contestant2.pk)
+        tools.assert_equals((contestant2.score, contestant2.all_correct), (1, False))
+        tools.assert_equals(list(self.contest.get_contestants_with_all_correct_answers()), [])
+        stats = ContestStats.objects.get(contest=self.contest)
+        tools.assert_equals((stats.correct_answers_count, stats.all_correct_answers_count), (2, 0))
+
+    def test_contestants_rescored_when_question_is_not_required(self):
+        question = Question.objects.get(pk=self.choices[1].question_id)
+        question.is_required = False
+        question.save()
+        contestant = Contestant.objects.get(pk=self.contestant.pk)
+        tools.assert_equals((contestant.score, contestant.all_correct), (1, True))
+
+    def test_contest_with_contestants_deleted(self):
+        ContestStats.objects.rebuild(self.contest)
+        self.contest.delete()
+        tools.assert_false(ContestStats.objects.exists())
+        tools.assert_false(Contestant.objects.exists())
+
+    def test_contestants_not_rescored_when_choice_text_changes(self):
+        with patch.object(Contest, 'rescore') as rescore:
+            self.choices[2].choice = 'Changed'
+            self.choices[2].save()
+        tools.assert_false(rescore.called)
+
+    def test_rebuild_stats(self):
+        stats = ContestStats.objects.rebuild(self.contest)
+        tools.assert_equals(stats.contestants_count, 2)
+        tools.assert_equals(stats.correct_answers_count, 1)
+        tools.assert_equals(stats.all_correct_answers_count, 1)
+        tools.assert_equals(stats.last_submission, self.contestant2.created)
+
+    def test_add_and_remove_contestant(self):
+        # contestants created by ORM are counted and rescored by update_score
+        stats = ContestStats.objects.get(contest=self.contest)
+        tools.assert_equals(stats.contestants_count, 2)
+        tools.assert_equals(stats.correct_answers_count, 1)
+        tools.assert_equals(stats.all_correct_answers_count, 1)
+        self.contestant.delete()
+        stats = ContestStats.objects.get(contest=self.contest)
+        tools.assert_equals(stats.contestants_count, 1)
+        tools.assert_equals(stats.correct_answers_count, 0)
+        tools.assert_equals(stats.all_correct_answers_count, 0)
+
+    def test_stats_follow_score_update(self):
+        self.answers[3].choice = self.choices[2]
+        self.answers[3].save()
+        self.contestant2.update_score()
+        stats = ContestStats.objects.get(contest=self.contest)
+        tools.assert_equals((stats.correct_answers_count, stats.all_correct_answers_count), (2, 1))
+        self.answers[0].delete()
+        self.contestant.update_score()
+        stats = ContestStats.objects.get(contest=self.contest)
+        tools.assert_equals((stats.correct_answers_count, stats.all_correct_answers_count), (2, 0))
+
+    def test_stats_match_contestants_after_delete(self):
+        self.contestant.delete()
+        self.contestant2.delete()
+        stats = ContestStats.objects.get(contest=self.contest)
+        tools.assert_equals(
+            (stats.contestants_count, stats.correct_answers_count, stats.all_correct_answers_count),
+            (0, 0, 0)
+        )
@@ -0,0 +1,157 @@
+from __future__ import unicode_literals
+
+from mock import call, patch
+from nose import tools
+
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test.client import RequestFactory
+from django.test.utils import override_settings
+
+from .cases import ContestTestCase
+
+from ella_contests.storages import CacheStorage, CookieStorage, PackedCookieStorage
+
+
+class StorageTestCase(ContestTestCase):
+    storage_class = None
+
+    def setUp(self):
+        super(StorageTestCase, self).setUp()
+        self.storage = self.storage_class()
+        self.request = RequestFactory().get('/')
+
+    def tearDown(self):
+        cache.clear()
+        super(StorageTestCase, self).tearDown()
+
+    def next_request(self, response):
+        """
+        Returns request sending cookies of the request before updated by
+        the response
+        """
+        request = RequestFactory().get('/')
+        request.COOKIES.update(self.request.COOKIES)
+        for name, morsel in response.cookies.items():
+            if morsel.value:
+                request.COOKIES[name] = morsel.value
+            else:
+                request.COOKIES.pop(name, None)
+        self.request = request
+        return request
+
+    def answer(self, question, data, step):
+        response = HttpResponse()
+        self.storage.set_data(self.contest, question.pk, data, response, request=self.request)
+        self.storage.set_last_step(self.contest, step, response, request=self.request)
+        self.next_request(response)
+        return response
+
+
+class TestCookieStorage(StorageTestCase):
+    storage_class = CookieStorage
+
+    def test_set_step_data_and_get_all_data(self):
+        response = HttpResponse()
+        self.storage.set_step_data(self.contest, self.questions[0].pk, {'choice': '1'}, 1, response,
+                                   request=self.request)
+        self.next_request(response)
+        tools.assert_equals(self.storage.get_last_step(self.contest, self.request), 1)
+        all_data = self.storage.get_all_data(self.contest, self.request)
+        tools.assert_equals(sorted(all_data.keys()), sorted(q.pk for q in self.contest.questions))
+        tools.assert_equals(all_data[self.questions[0].pk], {'choice': '1'})
+        tools.assert_equals(all_data[self.questions[1].pk], None)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class TestPackedCookieStorage(StorageTestCase):
+    storage_class = PackedCookieStorage
+
+    def test_all_steps_in_one_cookie(self):
+        self.answer(self.questions[0], {'choice': '1'}, 1)
+        response = self.answer(self.questions[1], {'choice': ['5', 'hi']}, 2)
+        tools.assert_equals(list(response.cookies.keys()), ['contest_%s' % self.contest.pk])
+        tools.assert_equals(self.storage.get_data(self.contest, self.questions[0].pk, self.request), {'choice': '1'})
+        tools.assert_equals(self.storage.get_data(self.contest, self.questions[1].pk, self.request),
+                            {'choice': ['5', 'hi']})
+        tools.assert_equals(self.storage.get_data(self.contest, self.questions[2].pk, self.request), None)
+        tools.assert_equals(self.storage.get_last_step(self.contest, self.request), 2)
+
+    def test_tampered_cookie_ignored(self):
+        self.answer(self.questions[0], {'choice': '1'}, 1)
+        name = 'contest_%s' % self.contest.pk
+        self.request.COOKIES[name] = self.request.COOKIES[name][:-1] + 'x'
+        tools.assert_equals(self.storage.get_last_step(self.contest, self.request), None)
+
+    def test_large_state_spills_to_cache(self):
+        self.storage.cookie_max_size = 100
+        self.storage.compress = False
+        response = self.answer(self.questions[0], {'choice': ['1', 'long text ' * 20]}, 1)
+        tools.assert_true(len(response.cookies['contest_%s' % self.contest.pk].value) < 100)
+        tools.assert_equals(self.storage.get_data(self.contest, self.questions[0].pk, self.request),
+                            {'choice': ['1', 'long text ' * 20]})
+
+        response = HttpResponse()
+        self.storage.remove_all_data(self.contest, response, request=self.request)
+        self.next_request(response)
+        tools.assert_equals(self.storage.get_last_step(self.contest, self.request), None)
+
+    def test_remove_last_step(self):
+        self.answer(self.questions[0], {'choice': '1'}, 1)
+        response = HttpResponse()
+        self.storage.remove_last_step(self.contest, response, request=self.request)
+        self.next_request(response)
+        tools.assert_equals(self.storage.get_last_step(self.contest, self.request), None)
+        tools.assert_equals(self.storage.get_data(self.contest, self.questions[0].pk, self.request), {'choice': '1'})
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class TestCacheStorage(StorageTestCase):
+    storage_class = CacheStorage
+
+    def test_only_token_in_cookie(self):
+        self.answer(self.questions[0], {'choice': '1'}, 1)
+        response = self.answer(self.questions[1], {'choice': ['5', 'hi']}, 2)
+        tools.assert_equals(list(response.cookies.keys()), ['contest_%s_token' % self.contest.pk])
+        token = response.cookies['contest_%s_token' % self.contest.pk].value
+        tools.assert_equals(len(token), 32)
+        tools.assert_equals(self.storage.get_data(self.contest, self.questions[0].pk, self.request), {'choice': '1'})
+        tools.assert_equals(self.storage.get_data(self.contest, self.questions[1].pk, self.request),
+                            {'choice': ['5', 'hi']})
+        tools.assert_equals(self.storage.get_last_step(self.contest, self.request), 2)
+
+    def test_remove_all_data(self):
+        self.answer(self.questions[0], {'choice': '1'}, 1)
+        token = self.request.COOKIES['contest_%s_token' % self.contest.pk]
+        response = HttpResponse()
+        self.storage.remove_all_data(self.contest, response, request=self.request)
+        tools.assert_equals(cache.get(self.storage._get_cache_key(self.contest, token)), None)
+        self.next_request(response)
+        tools.assert_equals(self.storage.get_last_step(self.contest, self.request), None)
+
+    def test_all_data_read_by_one_cache_call(self):
+        self.answer(self.questions[0], {'choice': '1'}, 1)
+        self.answer(self.questions[1], {'choice': ['5', 'hi']}, 2)
+        key = self.storage._get_cache_key(self.contest, self.request.COOKIES['contest_%s_token' % self.contest.pk])
+        with patch('ella_contests.storages.cache.get', wraps=cache.get) as cache_get:
+            all_data = self.storage.get_all_data(self.contest, self.request)
+        # the same cache is also used for snapshot of the contest
+        tools.assert_equals([c for c in cache_get.call_args_list if c[0][0] == key], [call(key)])
+        tools.assert_equals(all_data[self.questions[0].pk], {'choice': '1'})
+        tools.assert_equals(all_data[self.questions[1].pk], {'choice': ['5', 'hi']})
+        tools.assert_equals(all_data[self.questions[2].pk], None)
+
+    def test_set_step_data_writes_once(self):
+        response = HttpResponse()
+        with patch('ella_contests.storages.cache.set', wraps=cache.set) as cache_set:
+            self.storage.set_step_data(self.contest, self.questions[0].pk, {'choice': '1'}, 1, response,
+                                       request=self.request)
+        key_prefix = self.storage._get_cache_key(self.contest, '')
+        tools.assert_equals(len([c for c in cache_set.call_args_list if c[0][0].startswith(key_prefix)]), 1)
+        self.next_request(response)
+        tools.assert_equals(self.storage.get_last_step(self.contest, self.request), 1)
+        tools.assert_equals(self.storage.get_data(self.contest, self.questions[0].pk, self.request), {'choice': '1'})
+
+    def test_foreign_token_ignored(self):
+        self.request.COOKIES['contest_%s_token' % self.contest.pk] = 'x:y'
+        tools.assert_equals(self.storage.get_last_step(self.contest, self.request), None)
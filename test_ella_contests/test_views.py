@@ -1,9 +1,15 @@
+from django.http import HttpResponse
 from django.test.client import RequestFactory
 
+from mock import patch
 from nose import tools
 
 from .cases import ContestTestCase
 
+from ella_contests.forms import ContestantForm
+from ella_contests.models import Contestant
+from ella_contests.storages import storage
+
 
 class TestContestUrls(ContestTestCase):
     def setUp(self):
@@ -53,3 +59,44 @@ class TestContestUrls(ContestTestCase):
         tools.assert_equals(200, response.status_code)
         response = self.client.get(self.url + 'conditions/')
         tools.assert_equals(200, response.status_code)
+
+
+class TestContestantView(ContestTestCase):
+    def setUp(self):
+        super(TestContestantView, self).setUp()
+        self.url = self.contest.get_absolute_url() + 'contestant/'
+        self.data = {
+            'name': 'Joe',
+            'surname': 'Good',
+            'email': 'joe@joe.cz',
+            'address': 'XX street 123',
+        }
+        response = HttpResponse()
+        answers = [str(self.choices[2].pk), [str(self.choices[5].pk), 'hi'], str(self.choices[8].pk)]
+        for question, choice in zip(self.questions, answers):
+            storage.set_data(self.contest, question.pk, {'choice': choice}, response)
+        storage.set_last_step(self.contest, len(self.questions), response)
+        for name, morsel in response.cookies.items():
+            self.client.cookies[name] = morsel.value
+
+    def test_contestant_saved(self):
+        response = self.client.post(self.url, self.data)
+        tools.assert_equals(302, response.status_code)
+        tools.assert_equals(Contestant.objects.filter(contest=self.contest, email='joe@joe.cz').count(), 1)
+
+    def test_concurrent_submission_with_same_email(self):
+        clean = ContestantForm.clean
+
+        def clean_before_concurrent_submission(form):
+            cleaned_data = clean(form)
+            # other request with the same email is saved after this one
+            # passed validation
+            Contestant.objects.create(contest=self.contest, name='Joe', surname='Good',
+                                      email='joe@joe.cz', address='XX street 123')
+            return cleaned_data
+
+        with patch.object(ContestantForm, 'clean', clean_before_concurrent_submission):
+            response = self.client.post(self.url, self.data)
+        tools.assert_equals(200, response.status_code)
+        tools.assert_in(ContestantForm.error_messages['email_used'], response.context['form'].non_field_errors())
+        tools.assert_equals(Contestant.objects.filter(contest=self.contest, email='joe@joe.cz').count(), 1)